@@ -35,6 +35,41 @@ listdevices_exe = EXE(listdevices_pyz,
                       codesign_identity=None,
                       entitlements_file=None)
 
+# Network input companion sender
+sender_a = Analysis(['network-sender.py'],
+                    pathex=[],
+                    binaries=[
+                        ("./.venv/Lib/site-packages/discord/bin/libopus-0.x64.dll", "libs")
+                    ],
+                    datas=[],
+                    hiddenimports=[],
+                    hookspath=[],
+                    hooksconfig={},
+                    runtime_hooks=[],
+                    excludes=[],
+                    win_no_prefer_redirects=False,
+                    win_private_assemblies=False,
+                    cipher=block_cipher,
+                    noarchive=False)
+
+sender_pyz = PYZ(sender_a.pure, sender_a.zipped_data,
+                 cipher=block_cipher)
+
+sender_exe = EXE(sender_pyz,
+                 sender_a.scripts,
+                 [],
+                 exclude_binaries=True,
+                 name='network-sender',
+                 debug=False,
+                 bootloader_ignore_signals=False,
+                 strip=False,
+                 upx=True,
+                 console=True,
+                 disable_windowed_traceback=False,
+                 target_arch=None,
+                 codesign_identity=None,
+                 entitlements_file=None)
+
 # Audiophage streamer
 stream_a = Analysis(['stream.py'],
                     pathex=[],
@@ -77,6 +112,43 @@ stream_exe = EXE(stream_pyz,
                  codesign_identity=None,
                  entitlements_file=None)
 
+# Multi-instance supervisor
+supervisor_a = Analysis(['supervisor.py'],
+                        pathex=[],
+                        binaries=[],
+                        datas=[
+                            ("data/supervisor.TEMPLATE.toml", "data"),
+                        ],
+                        hiddenimports=[
+                            "stream",
+                        ],
+                        hookspath=[],
+                        hooksconfig={},
+                        runtime_hooks=[],
+                        excludes=[],
+                        win_no_prefer_redirects=False,
+                        win_private_assemblies=False,
+                        cipher=block_cipher,
+                        noarchive=False)
+
+supervisor_pyz = PYZ(supervisor_a.pure, supervisor_a.zipped_data,
+                     cipher=block_cipher)
+
+supervisor_exe = EXE(supervisor_pyz,
+                     supervisor_a.scripts,
+                     [],
+                     exclude_binaries=True,
+                     name='audiophage-supervisor',
+                     debug=False,
+                     bootloader_ignore_signals=False,
+                     strip=False,
+                     upx=True,
+                     console=True,
+                     disable_windowed_traceback=False,
+                     target_arch=None,
+                     codesign_identity=None,
+                     entitlements_file=None)
+
 # Final
 coll = COLLECT(stream_exe,
                stream_a.binaries,
@@ -86,6 +158,14 @@ coll = COLLECT(stream_exe,
                listdevices_a.binaries,
                listdevices_a.zipfiles,
                listdevices_a.datas,
+               sender_exe,
+               sender_a.binaries,
+               sender_a.zipfiles,
+               sender_a.datas,
+               supervisor_exe,
+               supervisor_a.binaries,
+               supervisor_a.zipfiles,
+               supervisor_a.datas,
                strip=False,
                upx=True,
                upx_exclude=[],
@@ -0,0 +1,219 @@
+"""
+Compares the command round-trip latency of the default asyncio event loop and uvloop (if installed)
+under synthetic Discord gateway event load.
+
+The event loop under test runs a local server that receives a zlib-compressed stream of JSON gateway-like events
+(decompressed, parsed and dispatched to a handler task each, like discord.py does) and, on a separate connection,
+small "command" requests it answers right away. A load thread sends events at a fixed rate while a client thread
+measures the round-trip time of commands; the EventLoopLagMonitor runs alongside to report scheduling delay.
+
+Run from the repository root with: python -m benchmarks.event_loop_latency
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import statistics
+import struct
+import threading
+import time
+import zlib
+from typing import Callable
+
+from core.event_loop import EventLoopLagMonitor
+
+FRAME_HEADER = struct.Struct(">BI")
+KIND_EVENT: int = 0
+KIND_COMMAND: int = 1
+KIND_RESPONSE: int = 2
+
+
+def make_event(sequence: int, payload_bytes: int) -> bytes:
+    return json.dumps({
+        "op": 0,
+        "s": sequence,
+        "t": "MESSAGE_CREATE",
+        "d": {
+            "id": str(random.getrandbits(63)),
+            "channel_id": str(random.getrandbits(63)),
+            "author": {"id": str(random.getrandbits(63)), "username": "user", "discriminator": "0001"},
+            "content": "x" * payload_bytes,
+            "mentions": [{"id": str(random.getrandbits(63))} for _ in range(3)],
+        },
+    }).encode("utf-8")
+
+
+def send_frame(sock: socket.socket, kind: int, body: bytes):
+    sock.sendall(FRAME_HEADER.pack(kind, len(body)) + body)
+
+
+def receive_exactly(sock: socket.socket, length: int) -> bytes:
+    data = b""
+    while len(data) < length:
+        chunk = sock.recv(length - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed.")
+        data += chunk
+    return data
+
+
+class BenchmarkServer:
+    """
+    The part running on the event loop under test.
+    """
+
+    def __init__(self):
+        self.events_dispatched: int = 0
+        self._decompressor = zlib.decompressobj()
+        self._handler_tasks: set[asyncio.Task] = set()
+
+    async def _handle_event(self, event: dict):
+        # Roughly what a cached gateway event handler does: build a few objects from the payload.
+        data = event["d"]
+        _ = [mention["id"] for mention in data["mentions"]], data["author"]["username"], len(data["content"])
+        await asyncio.sleep(0)
+        self.events_dispatched += 1
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                kind, length = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+                body = await reader.readexactly(length)
+
+                if kind == KIND_EVENT:
+                    for line in self._decompressor.decompress(body).splitlines():
+                        task = asyncio.create_task(self._handle_event(json.loads(line)))
+                        self._handler_tasks.add(task)
+                        task.add_done_callback(self._handler_tasks.discard)
+
+                elif kind == KIND_COMMAND:
+                    request = json.loads(body)
+                    response = json.dumps({"type": 4, "id": request["id"], "data": {"content": "Pong!"}})
+                    writer.write(FRAME_HEADER.pack(KIND_RESPONSE, len(response)) + response.encode("utf-8"))
+                    await writer.drain()
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def generate_load(port: int, event_rate: int, payload_bytes: int, stop: threading.Event):
+    """
+    Send gateway-like events in 10 ms bursts, compressed as a single zlib stream (like the gateway's zlib-stream).
+    """
+    compressor = zlib.compressobj()
+    events_per_burst: int = max(event_rate // 100, 1)
+    sequence: int = 0
+
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        next_burst = time.perf_counter()
+        while not stop.is_set():
+            events = b"\n".join(make_event(sequence + i, payload_bytes) for i in range(events_per_burst)) + b"\n"
+            sequence += events_per_burst
+            send_frame(sock, KIND_EVENT, compressor.compress(events) + compressor.flush(zlib.Z_SYNC_FLUSH))
+
+            next_burst += 0.01
+            time.sleep(max(0.0, next_burst - time.perf_counter()))
+
+
+def measure_commands(port: int, seconds: float, interval: float) -> list[float]:
+    """
+    Send a command every `interval` seconds and measure the round-trip time of each.
+    """
+    round_trips: list[float] = []
+
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        deadline = time.perf_counter() + seconds
+        command_id: int = 0
+
+        while time.perf_counter() < deadline:
+            command_id += 1
+            started_at = time.perf_counter()
+            send_frame(sock, KIND_COMMAND, json.dumps({"id": command_id, "name": "ping"}).encode("utf-8"))
+
+            kind, length = FRAME_HEADER.unpack(receive_exactly(sock, FRAME_HEADER.size))
+            receive_exactly(sock, length)
+            round_trips.append(time.perf_counter() - started_at)
+
+            time.sleep(interval)
+
+    return round_trips
+
+
+async def run_scenario(seconds: float, event_rate: int, payload_bytes: int) -> dict:
+    server = BenchmarkServer()
+    tcp_server = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+    port: int = tcp_server.sockets[0].getsockname()[1]
+
+    monitor = EventLoopLagMonitor(interval=0.01, warning_threshold=10.0, report_interval=0)
+    monitor_task = asyncio.create_task(monitor.run())
+
+    stop_load = threading.Event()
+    load_thread = threading.Thread(target=generate_load, args=(port, event_rate, payload_bytes, stop_load))
+    load_thread.start()
+
+    # Let the load settle before measuring.
+    await asyncio.sleep(1)
+    events_before = server.events_dispatched
+    round_trips = await asyncio.to_thread(measure_commands, port, seconds, 0.02)
+    events_dispatched = server.events_dispatched - events_before
+
+    stop_load.set()
+    await asyncio.to_thread(load_thread.join)
+    monitor.stop()
+    await monitor_task
+    tcp_server.close()
+    await tcp_server.wait_closed()
+
+    return {
+        "round_trips": round_trips,
+        "events_per_second": events_dispatched / seconds,
+        "lag": monitor.percentiles(),
+    }
+
+
+def run_with_loop(create_loop: Callable[[], asyncio.AbstractEventLoop], *args) -> dict:
+    loop = create_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(run_scenario(*args))
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event loop command latency benchmark (asyncio vs. uvloop).")
+    parser.add_argument("--seconds", type=float, default=10.0, help="How long to measure each event loop for.")
+    parser.add_argument("--event-rate", type=int, default=2000, help="Synthetic gateway events per second.")
+    parser.add_argument("--payload-bytes", type=int, default=1000, help="Approximate size of each event.")
+    args = parser.parse_args()
+
+    loops: dict[str, Callable[[], asyncio.AbstractEventLoop]] = {"asyncio": asyncio.new_event_loop}
+    try:
+        import uvloop
+        loops["uvloop"] = uvloop.new_event_loop
+    except ImportError:
+        print("uvloop is not installed, measuring the default asyncio event loop only.")
+
+    print(f"Command round trips under {args.event_rate} gateway events/s ({args.payload_bytes} B each), "
+          f"{args.seconds:.0f} s per event loop:")
+    for name, create_loop in loops.items():
+        result = run_with_loop(create_loop, args.seconds, args.event_rate, args.payload_bytes)
+
+        round_trips_ms = [round_trip * 1000 for round_trip in result["round_trips"]]
+        quantiles = statistics.quantiles(round_trips_ms, n=100, method="inclusive")
+        lag = result["lag"]
+
+        print(f"  {name}: {len(round_trips_ms)} commands, round trip p50 {quantiles[49]:.2f} ms, "
+              f"p95 {quantiles[94]:.2f} ms, p99 {quantiles[98]:.2f} ms, max {max(round_trips_ms):.2f} ms")
+        print(f"  {' ' * len(name)}  dispatched {result['events_per_second']:.0f} events/s, "
+              f"loop lag p50 {lag['p50'] * 1000:.2f} ms, p99 {lag['p99'] * 1000:.2f} ms, "
+              f"max {lag['max'] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Checks that the steady-state frame path doesn't allocate frame buffers: runs each input through the same path
+as a live stream (input source -> capture thread -> noise suppression -> volume -> capture queue -> player reads)
+and uses tracemalloc to check, per frame:
+- retained allocations: snapshot diffs over the whole run must not grow with the amount of frames,
+- transient allocations: the peak of memory allocated (and freed) while a frame passes through.
+
+Python itself allocates a few small objects per frame that can't be avoided: waiting on the capture queue allocates
+a lock, numpy's FFT wrappers build their arguments on every call, ... (about 1.6 KB per frame with noise suppression,
+1.1 KB without). The transient budget is just above that, so any frame-sized or half-frame temporary in the frame
+path fails the check. A typical (median) frame has to stay within the budget, single frames may exceed it
+by a little (e.g. when the capture thread and the player contend for the queue). The only exception is the PyAudio
+input, whose read returns a new bytes object per frame (it has no read-into API), so that path is allowed exactly
+one frame-sized allocation on top of the budget.
+
+Fails (exit code 1) if any check fails. Run from the repository root with: python -m benchmarks.frame_allocations
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from discord import AudioSource
+
+from core.audio_input import PyAudioInputSource
+from core.buffers import FRAME_SIZE, FRAME_SAMPLES, CHANNELS, FrameBuffer
+from core.capture import CaptureScheduler, CapturedSource
+from core.file_input import FileInputSource
+from core.input_source import InputSource
+from core.noise_suppression import SpectralNoiseSuppressor, NoiseSuppressionTransformer
+from core.volume import PooledVolumeTransformer
+
+# Retained allocations a run may grow by regardless of its length (e.g. interpreter caches warming up).
+RETAINED_BUDGET_BLOCKS: int = 50
+# Memory a typical frame may allocate (and free) while passing through, just above the unavoidable small objects.
+TRANSIENT_BUDGET_BYTES: int = 1792
+# How much more than the budget any single frame may allocate.
+TRANSIENT_SPIKE_BYTES: int = 768
+# A frame-sized bytes object (its data and the object itself).
+FRAME_OBJECT_SIZE: int = sys.getsizeof(bytes(FRAME_SIZE))
+
+
+def write_test_file(file_path: Path, seconds: float):
+    rng = np.random.default_rng(0)
+    samples = (rng.standard_normal((int(seconds * 48000), CHANNELS)) * 2000).astype(np.int16)
+
+    with wave.open(str(file_path), "wb") as wave_file:
+        wave_file.setnchannels(CHANNELS)
+        wave_file.setsampwidth(2)
+        wave_file.setframerate(48000)
+        wave_file.writeframes(samples.tobytes())
+
+
+class RecordedStream:
+    """
+    Stands in for an input device's PyAudio stream: like PyAudio, every read returns a new bytes object.
+    Reads return right away, so the capture thread runs ahead of the player and drops frames (the burst path).
+    """
+
+    def __init__(self, pcm: bytes):
+        self._pcm: bytes = pcm
+        self._offset: int = 0
+
+    def is_active(self) -> bool:
+        return True
+
+    def read(self, frames: int, exception_on_overflow: bool = True) -> bytes:
+        if self._offset + FRAME_SIZE > len(self._pcm):
+            self._offset = 0
+        data: bytes = self._pcm[self._offset:self._offset + FRAME_SIZE]
+        self._offset += FRAME_SIZE
+        return data
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def build_pipeline(captured_frames: AudioSource, denoise: bool) -> AudioSource:
+    # The same chain as stream.build_pipeline.
+    return PooledVolumeTransformer(
+        NoiseSuppressionTransformer(captured_frames, SpectralNoiseSuppressor(learning_seconds=0.5), enabled=denoise),
+        volume=0.8,
+    )
+
+
+@dataclass(eq=True, frozen=True)
+class FramePathAllocations:
+    name: str
+    frames: int
+    # Net allocations left behind by the run (from snapshot diffs).
+    retained_blocks: int
+    retained_bytes: int
+    # Source lines that retained the most blocks.
+    retained_by: tuple[str, ...]
+    # Largest and typical amount of memory allocated (and freed) while a single frame passed through, in bytes.
+    max_transient: int
+    median_transient: int
+
+
+def measure_frame_path(name: str, input_source: InputSource, denoise: bool, frames: int) -> FramePathAllocations:
+    scheduler = CaptureScheduler(max_concurrent_processing=1)
+    captured: CapturedSource = scheduler.start(
+        input_source, lambda captured_frames: build_pipeline(captured_frames, denoise), name
+    )
+
+    encoded = FrameBuffer()
+
+    def play_frame():
+        # What discord's player does with a frame: read it and encode it (reading every sample).
+        frame = captured.read()
+        if isinstance(frame, FrameBuffer):
+            np.copyto(encoded.samples, frame.samples)
+
+    try:
+        # Warm up: learn the noise profile and let every lazily initialized structure settle.
+        deadline: float = time.monotonic() + 10
+        while captured.frames_captured < 200 and time.monotonic() < deadline:
+            play_frame()
+
+        tracemalloc.start(5)
+        for _ in range(50):
+            play_frame()
+
+        transients: np.ndarray = np.zeros(frames, dtype=np.int64)
+        snapshot_before = tracemalloc.take_snapshot()
+        for i in range(frames):
+            tracemalloc.reset_peak()
+            memory_before, _ = tracemalloc.get_traced_memory()
+            play_frame()
+            _, memory_peak = tracemalloc.get_traced_memory()
+            transients[i] = memory_peak - memory_before
+        snapshot_after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+    finally:
+        scheduler.stop(captured)
+
+    if captured.underruns > frames // 10:
+        raise AssertionError(f"{name}: the capture thread couldn't keep up ({captured.underruns} underruns), "
+                             f"the frame path wasn't measured.")
+
+    ignored = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    differences = snapshot_after.filter_traces(ignored).compare_to(snapshot_before.filter_traces(ignored), "lineno")
+    growing = sorted((difference for difference in differences if difference.count_diff > 0),
+                     key=lambda difference: difference.count_diff, reverse=True)
+
+    return FramePathAllocations(
+        name=name,
+        frames=frames,
+        retained_blocks=sum(difference.count_diff for difference in differences),
+        retained_bytes=sum(difference.size_diff for difference in differences),
+        retained_by=tuple(f"{difference.traceback[0]}: +{difference.count_diff} blocks" for difference in growing[:5]),
+        max_transient=int(transients.max()),
+        median_transient=int(np.median(transients)),
+    )
+
+
+def check_frame_path(result: FramePathAllocations, frame_sized_allocations: int):
+    """
+    :param frame_sized_allocations: How many frame-sized allocations per frame the path can't avoid.
+    """
+    if result.retained_blocks > RETAINED_BUDGET_BLOCKS:
+        raise AssertionError(f"{result.name}: retained {result.retained_blocks} blocks ({result.retained_bytes} bytes) "
+                             f"over {result.frames} frames: {'; '.join(result.retained_by)}")
+
+    transient_budget: int = frame_sized_allocations * FRAME_OBJECT_SIZE + TRANSIENT_BUDGET_BYTES
+    if result.median_transient > transient_budget:
+        raise AssertionError(f"{result.name}: a typical frame allocated {result.median_transient} bytes while "
+                             f"passing through (budget: {transient_budget} bytes).")
+    if result.max_transient > transient_budget + TRANSIENT_SPIKE_BYTES:
+        raise AssertionError(f"{result.name}: allocated up to {result.max_transient} bytes while passing a frame "
+                             f"through (budget: {transient_budget} + {TRANSIENT_SPIKE_BYTES} bytes).")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Steady-state frame allocation check.")
+    parser.add_argument("--frames", type=int, default=3000, help="Amount of frames to measure for each path.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        file_path = Path(temporary_directory) / "input.wav"
+        write_test_file(file_path, seconds=10)
+        with wave.open(str(file_path), "rb") as wave_file:
+            recording: bytes = wave_file.readframes(wave_file.getnframes())
+
+        # (name, input source factory, noise suppression, unavoidable frame-sized allocations per frame)
+        frame_paths: list[tuple[str, Callable[[], InputSource], bool, int]] = [
+            ("file, noise suppression on", lambda: FileInputSource.create(file_path, loop=True), True, 0),
+            ("file, noise suppression off", lambda: FileInputSource.create(file_path, loop=True), False, 0),
+            ("device, noise suppression on", lambda: PyAudioInputSource(RecordedStream(recording), FRAME_SAMPLES),
+             True, 1),
+        ]
+
+        failures: list[str] = []
+        for name, create_input_source, denoise, frame_sized_allocations in frame_paths:
+            try:
+                result = measure_frame_path(name, create_input_source(), denoise, args.frames)
+                print(f"{name}: retained {result.retained_blocks} blocks ({result.retained_bytes} bytes) "
+                      f"over {result.frames} frames, transient per frame: median {result.median_transient} bytes, "
+                      f"max {result.max_transient} bytes (a frame is {FRAME_SIZE} bytes)")
+                check_frame_path(result, frame_sized_allocations)
+            except AssertionError as err:
+                failures.append(str(err))
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        return 1
+
+    print("OK: no frame buffers are allocated or retained in the steady-state frame path.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
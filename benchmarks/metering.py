@@ -0,0 +1,53 @@
+"""
+Measures the per-frame cost of the level meter run by the capture thread (see core.metering)
+relative to the 20 ms frame budget, and checks its readings against an exact (non-decimated) computation.
+
+Run from the repository root with: python -m benchmarks.metering
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.noise_suppression import generate_noisy_signal
+from core.buffers import FrameBuffer
+from core.metering import LevelMeter, to_dbfs
+from core.noise_suppression import SAMPLE_RATE, FRAME_SAMPLES
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Level meter cost benchmark.")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Amount of audio to meter.")
+    args = parser.parse_args()
+
+    signal = generate_noisy_signal(args.seconds)
+    frames: list[FrameBuffer] = []
+    for i in range(0, len(signal) - FRAME_SAMPLES + 1, FRAME_SAMPLES):
+        frame = FrameBuffer()
+        frame.samples[:] = signal[i:i + FRAME_SAMPLES]
+        frames.append(frame)
+
+    meter = LevelMeter()
+    rms_errors_db: list[float] = []
+    frame_times: list[float] = []
+    for frame in frames:
+        start = time.perf_counter()
+        meter.measure(frame.samples)
+        frame_times.append(time.perf_counter() - start)
+
+        exact_rms = float(np.sqrt(np.mean(frame.samples.astype(np.float64) ** 2)))
+        rms_errors_db.append(abs(meter.reading().rms_dbfs - to_dbfs(exact_rms)))
+
+    frame_times_us = np.array(frame_times) * 1e6
+    frame_budget_us = FRAME_SAMPLES / SAMPLE_RATE * 1e6
+
+    print(f"Metered {len(frames)} frames ({len(frames) * FRAME_SAMPLES / SAMPLE_RATE:.1f} s of audio).")
+    print(f"  per frame: mean {frame_times_us.mean():.2f} us, p99 {np.percentile(frame_times_us, 99):.2f} us, "
+          f"max {frame_times_us.max():.2f} us")
+    print(f"  share of the {frame_budget_us:.0f} us frame budget: {frame_times_us.mean() / frame_budget_us:.4%} "
+          f"(mean), {np.percentile(frame_times_us, 99) / frame_budget_us:.4%} (p99)")
+    print(f"  decimated RMS error: mean {np.mean(rms_errors_db):.2f} dB, max {np.max(rms_errors_db):.2f} dB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Measures the real-time factor of the spectral noise suppressor on synthetic audio
+(mains hum and its harmonics + broadband fan noise, with a tone that starts halfway through).
+
+Run from the repository root with: python -m benchmarks.noise_suppression
+"""
+import argparse
+import time
+
+import numpy as np
+
+from core.noise_suppression import SpectralNoiseSuppressor, SAMPLE_RATE, CHANNELS, FRAME_SAMPLES
+
+
+def generate_noisy_signal(seconds: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+
+    hum = sum(1500 / harmonic * np.sin(2 * np.pi * 50 * harmonic * t) for harmonic in range(1, 6))
+    fan = 400 * rng.standard_normal(len(t))
+    tone = np.where(t > seconds / 2, 6000 * np.sin(2 * np.pi * 440 * t), 0)
+
+    mono = hum + fan + tone
+    return np.clip(np.stack([mono] * CHANNELS, axis=1), -32768, 32767).astype(np.int16)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Noise suppression real-time factor benchmark.")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Amount of audio to process.")
+    parser.add_argument("--reduction-db", type=float, default=12.0, help="Noise reduction amount in dB.")
+    args = parser.parse_args()
+
+    signal = generate_noisy_signal(args.seconds)
+    frames = [signal[i:i + FRAME_SAMPLES].tobytes() for i in range(0, len(signal) - FRAME_SAMPLES + 1, FRAME_SAMPLES)]
+    audio_seconds = len(frames) * FRAME_SAMPLES / SAMPLE_RATE
+
+    # The first second (noise only) is used to learn the noise profile.
+    suppressor = SpectralNoiseSuppressor(reduction_db=args.reduction_db, learning_seconds=1.0)
+
+    frame_times: list[float] = []
+    output: list[bytes] = []
+    for frame in frames:
+        start = time.perf_counter()
+        output.append(suppressor.process(frame))
+        frame_times.append(time.perf_counter() - start)
+
+    total_time = sum(frame_times)
+    frame_times_us = np.array(frame_times) * 1e6
+    frame_budget_us = FRAME_SAMPLES / SAMPLE_RATE * 1e6
+
+    processed = np.frombuffer(b"".join(output), dtype=np.int16).reshape(-1, CHANNELS)
+    noise_section = slice(2 * SAMPLE_RATE, int(audio_seconds / 2 * SAMPLE_RATE))
+    noise_before = float(np.sqrt(np.mean(signal[noise_section].astype(np.float64) ** 2)))
+    noise_after = float(np.sqrt(np.mean(processed[noise_section].astype(np.float64) ** 2)))
+
+    print(f"Processed {audio_seconds:.1f} s of audio ({len(frames)} frames) in {total_time:.3f} s.")
+    print(f"  real-time factor: {total_time / audio_seconds:.4f} "
+          f"({audio_seconds / total_time:.0f}x faster than real time)")
+    print(f"  per frame: mean {frame_times_us.mean():.1f} us, p99 {np.percentile(frame_times_us, 99):.1f} us, "
+          f"max {frame_times_us.max():.1f} us (budget: {frame_budget_us:.0f} us)")
+    print(f"  noise-only RMS: {noise_before:.1f} -> {noise_after:.1f} "
+          f"({20 * np.log10(noise_after / noise_before):.1f} dB)")
+
+
+if __name__ == "__main__":
+    main()
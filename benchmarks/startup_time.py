@@ -0,0 +1,100 @@
+"""
+Tracks the bot's time to ready: how long a fresh process takes to get to the point where it starts logging in
+(interpreter startup, importing stream.py and loading the configuration), measured over several runs.
+Logging in itself depends on Discord and the network, so it isn't included.
+
+The work deferred until it's first needed (PortAudio initialization and loading Opus) is timed separately
+in the same process, afterwards. Pass --max-ms to fail (exit code 1) when the median time to ready regresses
+past a threshold.
+
+Run from the repository root with: python -m benchmarks.startup_time
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from core.configuration_base import BASE_DIR, DATA_DIR, CONFIGURATION_PATH_ENV
+
+# Runs in the measured process.
+PROBE_SCRIPT = """
+import json, sys, time
+started_at = time.perf_counter()
+import stream
+imported_at = time.perf_counter()
+
+deferred = {}
+from core.audio import ensure_opus, get_audio
+for name, initialize in (("opus", ensure_opus), ("portaudio", get_audio)):
+    initialized_at = time.perf_counter()
+    try:
+        initialize()
+        deferred[name] = time.perf_counter() - initialized_at
+    except Exception:
+        deferred[name] = None
+
+print(json.dumps({"import": imported_at - started_at, "deferred": deferred}))
+"""
+
+
+def measure_once(configuration_path: Path) -> dict:
+    environment = dict(os.environ, **{CONFIGURATION_PATH_ENV: str(configuration_path)})
+
+    started_at = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE_SCRIPT],
+        cwd=BASE_DIR, env=environment, capture_output=True, text=True, check=True,
+    )
+    process_time = time.perf_counter() - started_at
+
+    measurement = json.loads(result.stdout.strip().splitlines()[-1])
+    deferred_time = sum(seconds for seconds in measurement["deferred"].values() if seconds is not None)
+    # The process also ran the deferred initialization, which isn't part of the time to ready.
+    measurement["ready"] = process_time - deferred_time
+    return measurement
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to ready (startup time) benchmark.")
+    parser.add_argument("--runs", type=int, default=10, help="How many fresh processes to start.")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="Fail if the median time to ready is higher than this many milliseconds.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The template is a valid configuration, its input device is only opened once streaming.
+        configuration_path = Path(directory) / "configuration.toml"
+        configuration_path.write_text((DATA_DIR / "configuration.TEMPLATE.toml").read_text(encoding="utf-8"),
+                                      encoding="utf-8")
+
+        # The first run warms up the file system cache and writes bytecode caches, like any second start would.
+        measure_once(configuration_path)
+        measurements = [measure_once(configuration_path) for _ in range(args.runs)]
+
+    ready_ms = [measurement["ready"] * 1000 for measurement in measurements]
+    import_ms = [measurement["import"] * 1000 for measurement in measurements]
+    median_ready_ms = statistics.median(ready_ms)
+
+    print(f"Time to ready over {args.runs} runs (until logging in starts):")
+    print(f"  process: median {median_ready_ms:.0f} ms, min {min(ready_ms):.0f} ms, max {max(ready_ms):.0f} ms")
+    print(f"  importing stream.py: median {statistics.median(import_ms):.0f} ms")
+    for name in ("opus", "portaudio"):
+        seconds = [measurement["deferred"][name] for measurement in measurements]
+        if None in seconds:
+            print(f"  deferred {name} initialization: not available")
+        else:
+            print(f"  deferred {name} initialization: median {statistics.median(seconds) * 1000:.0f} ms "
+                  f"(not part of the time to ready)")
+
+    if args.max_ms is not None and median_ready_ms > args.max_ms:
+        print(f"Regression: the median time to ready ({median_ready_ms:.0f} ms) is over {args.max_ms:.0f} ms.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
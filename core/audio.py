@@ -1,12 +1,17 @@
 import logging
+import threading
+import time
 from dataclasses import dataclass
+from typing import Optional, TYPE_CHECKING
 
-from pyaudio import PyAudio, Stream, paInt16
-# noinspection PyProtectedMember
-from discord.opus import _load_default as opus_load_default, is_loaded as opus_is_loaded, load_opus
+import numpy as np
 
 from core.configuration_base import BASE_DIR
 from core.exceptions import NoSuchAudioDevice
+from core.metering import to_dbfs
+
+if TYPE_CHECKING:
+    from pyaudio import PyAudio, Stream
 
 
 # Dataclasses to store PyAudio information in.
@@ -25,8 +30,35 @@ class PyAudioDevice:
     default_sample_rate: int
 
 
+@dataclass(eq=True, frozen=True)
+class PyAudioDeviceProbe:
+    device: PyAudioDevice
+    max_input_channels: int
+    supported_sample_rates: list[int]
+    supported_channel_counts: list[int]
+    # Whether Audiophage can stream this device (48 kHz default sample rate, stereo).
+    is_usable: bool
+    # The following are None if the device couldn't be opened (see error).
+    probed_sample_rate: Optional[int]
+    probed_channels: Optional[int]
+    input_latency_ms: Optional[float]
+    time_to_first_frame_ms: Optional[float]
+    peak_dbfs: Optional[float]
+    rms_dbfs: Optional[float]
+    has_signal: Optional[bool]
+    error: Optional[str]
+
+
 log = logging.getLogger(__name__)
-audio = PyAudio()
+
+# PortAudio is initialized on first use (see get_audio): it takes a while and isn't needed for network,
+# file or pipe input.
+_audio: Optional["PyAudio"] = None
+_audio_lock: threading.Lock = threading.Lock()
+
+# Sample rates and (at most) channel counts checked when probing devices.
+PROBE_SAMPLE_RATES: tuple[int, ...] = (8000, 16000, 22050, 32000, 44100, 48000, 88200, 96000, 192000)
+PROBE_MAX_CHANNELS: int = 8
 
 # Globals that contain cached audio APIs and devices.
 host_api_index_to_name: dict[int, PyAudioHostAPI] = {}
@@ -37,7 +69,7 @@ def open_input_device(
         device_name: str,
         with_sample_rate: int = 48000,
         with_host_api_name: str = "Windows WASAPI"
-) -> tuple[Stream, int]:
+) -> tuple["Stream", int]:
     """
     Open an input device's Stream.
 
@@ -46,6 +78,9 @@ def open_input_device(
     :param with_host_api_name: Host API (name) to use.
     :return: PyAudio input (Stream) and frames per buffer (int) tuple.
     """
+    from pyaudio import paInt16
+    audio: "PyAudio" = get_audio()
+
     matching_devices: list[PyAudioDevice] = [
         d for d in device_index_to_device.values()
         if d.name == device_name and d.default_sample_rate == with_sample_rate and d.host_api.name == with_host_api_name
@@ -70,27 +105,147 @@ def open_input_device(
     )
 
 
+def probe_input_device(device: PyAudioDevice, seconds: float = 0.5) -> Optional[PyAudioDeviceProbe]:
+    """
+    Query the supported formats of an input device and briefly open it to measure
+    the time it takes to deliver the first 20 ms frame and whether it's producing any signal.
+
+    :param device: Device to probe.
+    :param seconds: How long to capture audio for.
+    :return: PyAudioDeviceProbe instance or None if the device has no input channels.
+    """
+    from pyaudio import paInt16
+    audio: "PyAudio" = get_audio()
+
+    max_input_channels: int = int(audio.get_device_info_by_index(device.index).get("maxInputChannels", 0))
+    if max_input_channels < 1:
+        return None
+
+    def is_supported(sample_rate: int, channels: int) -> bool:
+        try:
+            return audio.is_format_supported(
+                sample_rate,
+                input_device=device.index,
+                input_channels=channels,
+                input_format=paInt16,
+            )
+        except ValueError:
+            return False
+
+    supported_sample_rates: list[int] = [
+        rate for rate in PROBE_SAMPLE_RATES if is_supported(rate, min(max_input_channels, 2))
+    ]
+    supported_channel_counts: list[int] = [
+        channels for channels in range(1, min(max_input_channels, PROBE_MAX_CHANNELS) + 1)
+        if is_supported(device.default_sample_rate, channels)
+    ]
+
+    sample_rate: int = 48000 if 48000 in supported_sample_rates else device.default_sample_rate
+    channels: int = 2 if 2 in supported_channel_counts else min(max_input_channels, 2)
+    frames_per_buffer: int = int(sample_rate * 0.02)
+
+    probe = dict(
+        device=device,
+        max_input_channels=max_input_channels,
+        supported_sample_rates=supported_sample_rates,
+        supported_channel_counts=supported_channel_counts,
+        is_usable=device.default_sample_rate == 48000 and 2 in supported_channel_counts,
+        probed_sample_rate=None,
+        probed_channels=None,
+        input_latency_ms=None,
+        time_to_first_frame_ms=None,
+        peak_dbfs=None,
+        rms_dbfs=None,
+        has_signal=None,
+        error=None,
+    )
+
+    stream: Optional["Stream"] = None
+    try:
+        opened_at: float = time.perf_counter()
+        stream = audio.open(
+            format=paInt16,
+            channels=channels,
+            rate=sample_rate,
+            input=True,
+            input_device_index=device.index,
+            frames_per_buffer=frames_per_buffer,
+        )
+        frames: list[bytes] = [stream.read(frames_per_buffer, exception_on_overflow=False)]
+        time_to_first_frame: float = time.perf_counter() - opened_at
+
+        for _ in range(max(int(seconds / 0.02), 1) - 1):
+            frames.append(stream.read(frames_per_buffer, exception_on_overflow=False))
+
+        samples = np.frombuffer(b"".join(frames), dtype=np.int16).astype(np.float64)
+        peak: float = float(np.max(np.abs(samples)))
+
+        probe.update(
+            probed_sample_rate=sample_rate,
+            probed_channels=channels,
+            input_latency_ms=round(stream.get_input_latency() * 1000, 1),
+            time_to_first_frame_ms=round(time_to_first_frame * 1000, 1),
+            peak_dbfs=to_dbfs(peak),
+            rms_dbfs=to_dbfs(float(np.sqrt(np.mean(samples ** 2)))),
+            # Anything but digital silence (disconnected or muted devices usually deliver all zeros).
+            has_signal=peak > 0,
+        )
+    except OSError as err:
+        probe.update(error=str(err))
+    finally:
+        if stream is not None:
+            stream.stop_stream()
+            stream.close()
+
+    return PyAudioDeviceProbe(**probe)
+
+
 def ensure_opus():
     """
     This helper function attempts to load the default opus library (if installed),
     falling back to "libs/opus.dll" if the first attempt fails (especially useful in packaged versions of the bot).
+    Only needed once something is encoded, so it's called right before connecting to voice instead of on startup.
     """
+    # noinspection PyProtectedMember
+    from discord.opus import _load_default as opus_load_default, is_loaded as opus_is_loaded, load_opus
+
+    if opus_is_loaded():
+        return
+
+    loaded_at: float = time.perf_counter()
     opus_load_default()
 
     if not opus_is_loaded():
         opus_dll_path = (BASE_DIR / "libs/libopus-0.x64.dll").resolve()
         load_opus(str(opus_dll_path))
 
-    log.info(f"Opus is loaded: {opus_is_loaded()}")
+    log.info(f"Opus is loaded: {opus_is_loaded()} (in {(time.perf_counter() - loaded_at) * 1000:.0f} ms).")
 
 
-def setup():
+def get_audio() -> "PyAudio":
     """
-    This function gets and caches the host audio APIs and devices.
+    Get the PyAudio instance, initializing PortAudio (and enumerating the host audio APIs and devices,
+    see `setup`) on first use.
     """
-    global host_api_index_to_name
-    global device_index_to_device
+    global _audio
 
+    with _audio_lock:
+        if _audio is None:
+            from pyaudio import PyAudio
+
+            initialized_at: float = time.perf_counter()
+            audio = PyAudio()
+            setup(audio)
+            _audio = audio
+            log.info(f"Initialized PortAudio in {(time.perf_counter() - initialized_at) * 1000:.0f} ms.")
+
+    return _audio
+
+
+def setup(audio: "PyAudio"):
+    """
+    This function gets and caches the host audio APIs and devices.
+    """
     # Enumerate all host audio APIs
     api_count: int = audio.get_host_api_count()
     for api_index in range(api_count):
@@ -142,5 +297,3 @@ def setup():
 
     log.info(f"Enumerated {len(device_index_to_device)} host audio devices.")
 
-
-setup()
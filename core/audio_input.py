@@ -1,23 +1,27 @@
 import logging
 import traceback
-from typing import Optional
-
-from discord import AudioSource
-from pyaudio import Stream
+from typing import Optional, TYPE_CHECKING
 
 from .audio import open_input_device
+from .buffers import FrameBuffer
 from .exceptions import AudioException
+from .input_source import InputSource
+
+if TYPE_CHECKING:
+    from pyaudio import Stream
 
 log = logging.getLogger(__name__)
 
 
-class PyAudioInputSource(AudioSource):
+class PyAudioInputSource(InputSource):
     """
     A discord AudioSource that takes and streams a PyAudio stream.
     """
     __slots__ = ("_stream", "_frames_per_buffer", "_is_closed")
 
-    def __init__(self, stream: Stream, frames_per_buffer: int):
+    is_clocked: bool = True
+
+    def __init__(self, stream: "Stream", frames_per_buffer: int):
         """
         Given a PyAudio (input) Stream and the amount of frames per buffer the Stream was configured with,
         create a new PyAudioInputSource that can be passed over to VoiceClient.play.
@@ -28,6 +32,7 @@ class PyAudioInputSource(AudioSource):
                                   Discord.py requests this is equal to 20ms of audio, which means (at 48 kHz):
                                   48000 * 0.02 = 960 frames.
         """
+        super().__init__()
         log.debug(f"New PyAudioInputSource: {frames_per_buffer=}.")
 
         # A few checks to make sure we can actually use this Stream instead of just silently failing.
@@ -66,16 +71,20 @@ class PyAudioInputSource(AudioSource):
 
             raise
 
-    def read(self) -> bytes:
+    def read_into(self, buffer: FrameBuffer) -> bool:
         """
-        Read 20ms worth of audio. The length of the bytes returned will be:
+        Read 20ms worth of audio into the buffer. The amount of bytes read is:
         frames * 2 (stereo) * 2 (16 bits) = 3840
         """
         if self._is_closed:
-            return bytes(self._frames_per_buffer * 2 * 2)
+            buffer.samples.fill(0)
+            return True
 
+        # PyAudio has no read-into API, so this is the one copy (and allocation) per frame we can't avoid.
+        # Overflows aren't fatal: a stream opened ahead of time (see session restore) overflows until it's read.
         # noinspection PyTypeChecker
-        return self._stream.read(self._frames_per_buffer)
+        buffer.view[:] = self._stream.read(self._frames_per_buffer, exception_on_overflow=False)
+        return True
 
     def is_opus(self) -> bool:
         return False
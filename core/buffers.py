@@ -0,0 +1,43 @@
+import ctypes
+
+import numpy as np
+
+# 20 ms of 16-bit 48 kHz stereo PCM, the only frame format discord.py accepts.
+CHANNELS: int = 2
+FRAME_SAMPLES: int = 960
+FRAME_SIZE: int = FRAME_SAMPLES * CHANNELS * 2
+
+
+class FrameBuffer(ctypes.c_char * FRAME_SIZE):
+    """
+    A reusable 20 ms frame of 16-bit 48 kHz stereo PCM.
+
+    Being a ctypes array, it can be passed to discord's Opus encoder as-is (no conversion to bytes).
+    `samples` (a (960, 2) int16 numpy array) and `view` (a byte memoryview) both point to the same memory
+    and are created only once, so filling and processing a frame doesn't allocate anything.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.samples: np.ndarray = np.frombuffer(self, dtype=np.int16).reshape(FRAME_SAMPLES, CHANNELS)
+        self.view: memoryview = memoryview(self).cast("B")
+
+
+class FrameBufferPool:
+    """
+    A fixed ring of FrameBuffers that are handed out in turn.
+
+    A buffer is reused after `size` more buffers have been acquired, which is safe as long as each frame
+    is fully consumed (encoded and sent) before that - the discord AudioPlayer consumes a frame
+    in the same iteration it reads it.
+    """
+    __slots__ = ("_buffers", "_index")
+
+    def __init__(self, size: int = 4):
+        self._buffers: tuple[FrameBuffer, ...] = tuple(FrameBuffer() for _ in range(max(size, 2)))
+        self._index: int = 0
+
+    def acquire(self) -> FrameBuffer:
+        index = self._index
+        self._index = (index + 1) % len(self._buffers)
+        return self._buffers[index]
@@ -0,0 +1,353 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional, Union
+
+from discord import AudioSource
+
+from .buffers import FrameBuffer
+from .input_source import InputSource
+from .metering import LevelMeter
+from .network_input import OPUS_SILENCE
+from .profiling import DeterministicProfiler, PROFILED_THREAD_PLAYER
+
+log = logging.getLogger(__name__)
+
+# How many processed frames can wait for the player: bounds the latency the capture thread adds (60 ms).
+CAPTURE_QUEUE_DEPTH: int = 3
+FRAME_DURATION: float = 0.02
+
+
+def _usable_cpu_count() -> int:
+    """
+    Amount of CPU cores this process may run on (respects CPU pinning, e.g. by the supervisor).
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        # Not available on Windows and macOS.
+        return os.cpu_count() or 1
+
+
+class _FrameHandoff(AudioSource):
+    """
+    The first AudioSource of a processing pipeline run by a capture thread:
+    returns the frame the capture thread has just read from the input source.
+    """
+    __slots__ = ("frame", "_is_opus")
+
+    def __init__(self, is_opus: bool):
+        self.frame: Union[FrameBuffer, bytes] = b""
+        self._is_opus: bool = is_opus
+
+    def read(self) -> Union[FrameBuffer, bytes]:
+        return self.frame
+
+    def is_opus(self) -> bool:
+        return self._is_opus
+
+
+class CapturedSource(AudioSource):
+    """
+    The AudioSource handed to VoiceClient.play for a stream whose input is read and processed by a capture thread
+    (see CaptureScheduler.start). Frames are taken from the capture queue; if none is ready in time (an underrun),
+    silence is sent instead, so a stalled input never stalls the player.
+
+    The capture thread outlives the player: when the voice connection drops, the player stops (and cleans up
+    its source), but capturing continues until CaptureScheduler.stop, so the stream can be played again
+    by a new voice client without reopening the input.
+    """
+    __slots__ = (
+        "input_source", "pipeline", "name", "meter",
+        "_scheduler", "_handoff", "_queue", "_free_buffers", "_played_buffer", "_silence", "_thread", "_is_running",
+        "frames_captured", "frames_dropped", "underruns", "started_at", "last_frame_at", "last_read_at",
+        "player_thread_ident", "_profiler", "_close_lock", "_has_exited", "_close_on_exit",
+    )
+
+    def __init__(
+            self,
+            scheduler: "CaptureScheduler",
+            input_source: InputSource,
+            build_pipeline: Callable[[AudioSource], AudioSource],
+            name: str,
+    ):
+        self.input_source: InputSource = input_source
+        self.name: str = name
+        self._scheduler: "CaptureScheduler" = scheduler
+
+        self._handoff: _FrameHandoff = _FrameHandoff(input_source.is_opus())
+        self.pipeline: AudioSource = build_pipeline(self._handoff)
+
+        self._queue: queue.Queue = queue.Queue(maxsize=CAPTURE_QUEUE_DEPTH)
+        # Buffers are only reused once they're released: when the player reads the next frame (it consumes
+        # a frame in the same iteration it reads it) or when a queued frame is dropped. Enough for every queued
+        # frame, the one being played and the one being written by the capture thread.
+        self._free_buffers: deque[FrameBuffer] = deque(FrameBuffer() for _ in range(CAPTURE_QUEUE_DEPTH + 2))
+        self._played_buffer: Optional[FrameBuffer] = None
+        self._silence: Union[FrameBuffer, bytes] = OPUS_SILENCE if self.is_opus() else FrameBuffer()
+        # Levels of the processed audio (Opus isn't decoded, so it isn't metered).
+        self.meter: LevelMeter = LevelMeter(scheduler.meter_peak_hold_seconds)
+
+        self.frames_captured: int = 0
+        self.frames_dropped: int = 0
+        self.underruns: int = 0
+        # time.monotonic() of starting the capture thread, the last frame read from the input
+        # and the player's last read (0 if nothing was read yet).
+        self.started_at: float = 0.0
+        self.last_frame_at: float = 0.0
+        self.last_read_at: float = 0.0
+        # The thread that last read from this source (discord's player thread), None if nothing was read yet.
+        self.player_thread_ident: Optional[int] = None
+        self._profiler: Optional[DeterministicProfiler] = None
+
+        self._is_running: bool = True
+        # Closing the input is handed over to the capture thread if it's still blocked reading it (see close).
+        self._close_lock: threading.Lock = threading.Lock()
+        self._has_exited: bool = False
+        self._close_on_exit: bool = False
+        self._thread: threading.Thread = threading.Thread(
+            target=self._capture,
+            name=f"audiophage-capture-{name}",
+            daemon=True,
+        )
+
+    @property
+    def thread_ident(self) -> Optional[int]:
+        return self._thread.ident
+
+    @property
+    def is_running(self) -> bool:
+        """
+        Whether the capture thread is still running (False once the input has ended or the stream was stopped).
+        """
+        return self._is_running
+
+    def attach_profiler(self, profiler: DeterministicProfiler):
+        """
+        Attach a DeterministicProfiler that will be driven from the player thread (encoding and sending the frames).
+        The profiler detaches itself once it has finished.
+        """
+        self._profiler = profiler
+
+    def _acquire(self) -> FrameBuffer:
+        try:
+            return self._free_buffers.popleft()
+        except IndexError:
+            # Every buffer is accounted for, so this shouldn't happen - but never overwrite one that's in use.
+            log.warning(f"Capture thread {self.name} ran out of frame buffers, allocating a new one.")
+            return FrameBuffer()
+
+    def _release(self, frame: Union[FrameBuffer, bytes]):
+        if isinstance(frame, FrameBuffer) and frame is not self._silence:
+            self._free_buffers.append(frame)
+
+    def _enqueue(self, frame: Union[FrameBuffer, bytes]):
+        if self.input_source.is_clocked:
+            # The input delivers frames in real time: if the player fell behind, drop the oldest frame
+            # instead of letting latency build up.
+            while True:
+                try:
+                    self._queue.put_nowait(frame)
+                    return
+                except queue.Full:
+                    try:
+                        self._release(self._queue.get_nowait())
+                        self.frames_dropped += 1
+                    except queue.Empty:
+                        pass
+
+        # Otherwise (files, pipes, ...) the player's pace is the only clock, so wait for it.
+        while self._is_running:
+            try:
+                self._queue.put(frame, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _capture(self):
+        input_source = self.input_source
+        handoff = self._handoff
+        pipeline = self.pipeline
+
+        try:
+            while self._is_running:
+                # Waiting for the input (the device clock, a pipe, ...) doesn't take a processing slot.
+                frame = input_source.read()
+                if not frame:
+                    break
+                self.last_frame_at = time.monotonic()
+
+                handoff.frame = frame
+                with self._scheduler.processing_slot:
+                    processed = pipeline.read()
+
+                if not handoff.is_opus():
+                    # The input source may reuse its buffer while this frame is still queued.
+                    buffer = self._acquire()
+                    buffer.view[:] = processed.view if isinstance(processed, FrameBuffer) else processed
+                    processed = buffer
+                    self.meter.measure(buffer.samples)
+
+                self.frames_captured += 1
+                self._enqueue(processed)
+
+        except Exception as err:
+            log.error(f"Capture thread {self.name} crashed: {err!r}")
+            raise
+
+        finally:
+            handoff.frame = b""
+            # Tells the player the stream has ended (an empty frame stops it).
+            self._is_running = False
+            try:
+                self._queue.put_nowait(b"")
+            except queue.Full:
+                pass
+
+            with self._close_lock:
+                self._has_exited = True
+                close_now: bool = self._close_on_exit
+            if close_now:
+                log.info(f"The pending read of capture thread {self.name} has returned, closing its input.")
+                self._close()
+
+    def _close(self):
+        try:
+            self.pipeline.cleanup()
+            self.input_source.cleanup()
+        except Exception as err:
+            log.error(f"Couldn't close the input of {self.name}: {err!r}")
+
+    def close(self) -> bool:
+        """
+        Clean up the pipeline and close the input source once the capture thread has exited: right away if it has,
+        otherwise the capture thread does it itself once its pending read returns (closing an input while a read
+        is blocked inside it isn't safe, e.g. PortAudio doesn't support closing a stream that is being read).
+
+        :return: Whether the input was closed right away.
+        """
+        with self._close_lock:
+            if not self._has_exited:
+                self._close_on_exit = True
+                return False
+
+        self._close()
+        return True
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._thread.start()
+
+    def read(self) -> Union[FrameBuffer, bytes]:
+        self.last_read_at = time.monotonic()
+        self.player_thread_ident = threading.get_ident()
+        if self._profiler is not None and not self._profiler.on_frame(PROFILED_THREAD_PLAYER):
+            self._profiler = None
+
+        # The player has consumed the previous frame by now.
+        if self._played_buffer is not None:
+            self._release(self._played_buffer)
+            self._played_buffer = None
+
+        try:
+            frame = self._queue.get(timeout=FRAME_DURATION)
+        except queue.Empty:
+            if not self._is_running and not self._thread.is_alive():
+                return b""
+
+            self.underruns += 1
+            return self._silence
+
+        if isinstance(frame, FrameBuffer):
+            self._played_buffer = frame
+        return frame
+
+    def is_opus(self) -> bool:
+        return self._handoff.is_opus()
+
+    def cleanup(self) -> None:
+        # Called whenever a player stops, including when the voice connection drops - keep capturing,
+        # the stream is stopped with CaptureScheduler.stop.
+        pass
+
+
+class CaptureScheduler:
+    """
+    Runs a capture thread for each active stream. Reading the input happens concurrently (it's mostly waiting),
+    but processing (noise suppression, volume, ...) is limited to one frame per usable CPU core at a time,
+    so any amount of streams share the cores without oversubscribing them.
+    """
+    __slots__ = ("processing_slot", "meter_peak_hold_seconds", "_streams", "_lock")
+
+    def __init__(self, max_concurrent_processing: Optional[int] = None, meter_peak_hold_seconds: float = 10.0):
+        """
+        :param max_concurrent_processing: How many frames can be processed at the same time
+                                          (defaults to the amount of CPU cores this process may run on).
+        :param meter_peak_hold_seconds: Peak hold time of the streams' level meters.
+        """
+        concurrency: int = max_concurrent_processing or _usable_cpu_count()
+        self.meter_peak_hold_seconds: float = meter_peak_hold_seconds
+        self.processing_slot: threading.BoundedSemaphore = threading.BoundedSemaphore(concurrency)
+        self._streams: list[CapturedSource] = []
+        self._lock: threading.Lock = threading.Lock()
+
+        log.debug(f"New CaptureScheduler: {concurrency} concurrent processing slots.")
+
+    @property
+    def streams(self) -> list[CapturedSource]:
+        with self._lock:
+            return list(self._streams)
+
+    def start(
+            self,
+            input_source: InputSource,
+            build_pipeline: Callable[[AudioSource], AudioSource],
+            name: str,
+    ) -> CapturedSource:
+        """
+        Start capturing an input source in its own thread.
+
+        :param input_source: Input source to read from.
+        :param build_pipeline: Called with the AudioSource that provides the captured frames,
+                               returns the end of the processing pipeline to run in the capture thread.
+        :param name: Name of the stream (used for the thread name and logging).
+        :return: CapturedSource that can be passed over to VoiceClient.play.
+        """
+        captured = CapturedSource(self, input_source, build_pipeline, name)
+        with self._lock:
+            self._streams.append(captured)
+
+        captured.start()
+        log.info(f"Started capture thread for {name} ({len(self._streams)} active).")
+        return captured
+
+    def stop(self, captured: CapturedSource):
+        """
+        Stop a stream's capture thread and close its input source. Safe to call more than once.
+        """
+        with self._lock:
+            if captured not in self._streams:
+                return
+            self._streams.remove(captured)
+
+        # Let the capture thread finish its current read before closing the input underneath it
+        # (a pipe or a hanging device can block indefinitely, so don't wait forever).
+        # noinspection PyProtectedMember
+        captured._is_running = False
+        # noinspection PyProtectedMember
+        is_capture_thread: bool = captured._thread is threading.current_thread()
+        if not is_capture_thread:
+            # noinspection PyProtectedMember
+            captured._thread.join(timeout=1)
+
+        if not captured.close() and not is_capture_thread:
+            # If the read never returns (e.g. a driver hanging inside PortAudio), the input is leaked.
+            log.warning(f"Capture thread {captured.name} is still blocked reading its input, "
+                        f"it will be closed once the read returns.")
+
+        log.info(f"Stopped capture thread for {captured.name}: {captured.frames_captured} frames captured, "
+                 f"{captured.frames_dropped} dropped, {captured.underruns} underruns "
+                 f"({len(self._streams)} still active).")
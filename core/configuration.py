@@ -1,12 +1,77 @@
 import logging
+import os
+from dataclasses import dataclass, replace
 from pathlib import Path
 from typing import Union, Optional
 
-from .configuration_base import TOMLConfig, DATA_DIR
+from .configuration_base import TOMLConfig, DATA_DIR, CONFIGURATION_PATH_ENV
+from .configuration_utilities import get_optional_path_from_str
 from .utilities import clamp
 
 log = logging.getLogger(__name__)
 
+INPUT_TYPES: tuple[str, ...] = ("device", "network", "file", "pipe")
+DEFAULT_INPUT_PROFILE_NAME: str = "default"
+
+
+@dataclass(eq=True, frozen=True)
+class InputProfile:
+    """
+    A named audio input (see the "audio.profiles" array of tables in configuration.toml).
+    Only the values relevant to the input type are used.
+    """
+    name: str
+    input_type: str
+    host_api_name: str
+    input_device_name: Optional[str]
+    network_bind_host: str
+    network_port: int
+    network_codec: str
+    network_jitter_buffer_ms: int
+    file_path: Optional[Path]
+    file_loop: bool
+    pipe_path: str
+    pipe_bulk_frames: int
+
+
+def _parse_input_profile(profile: TOMLConfig, default: InputProfile) -> InputProfile:
+    """
+    Parse an entry of the "audio.profiles" array of tables, falling back to the default profile's values
+    (the ones configured directly in the "audio" table and its subtables) for any missing key.
+    """
+    name: str = str(profile.get("name", raise_on_missing_key=True))
+    if name == DEFAULT_INPUT_PROFILE_NAME:
+        raise ValueError(f"Invalid audio.profiles name: '{name}' is reserved for the input configured in [audio].")
+
+    parsed = replace(
+        default,
+        name=name,
+        input_type=profile.get("input_type", fallback=default.input_type),
+        host_api_name=profile.get("host_api_name", fallback=default.host_api_name),
+        input_device_name=profile.get("input_device_name", fallback=default.input_device_name),
+        network_bind_host=profile.get("bind_host", fallback=default.network_bind_host),
+        network_port=int(profile.get("port", fallback=default.network_port)),
+        network_codec=profile.get("codec", fallback=default.network_codec),
+        network_jitter_buffer_ms=clamp(int(profile.get("jitter_buffer_ms", fallback=default.network_jitter_buffer_ms)),
+                                       20, 1000),
+        file_path=get_optional_path_from_str(profile.get("path")) or default.file_path,
+        file_loop=bool(profile.get("loop", fallback=default.file_loop)),
+        pipe_path=profile.get("path", fallback=default.pipe_path),
+        pipe_bulk_frames=clamp(int(profile.get("bulk_frames", fallback=default.pipe_bulk_frames)), 1, 500),
+    )
+
+    if parsed.input_type not in INPUT_TYPES:
+        raise ValueError(f"Invalid input_type in audio profile '{name}': '{parsed.input_type}' "
+                         f"(expected device, network, file or pipe).")
+    if parsed.input_type == "device" and parsed.input_device_name is None:
+        raise ValueError(f"Configuration value missing: 'input_device_name' in audio profile '{name}'.")
+    if parsed.input_type == "network" and parsed.network_codec not in ("opus", "pcm"):
+        raise ValueError(f"Invalid codec in audio profile '{name}': '{parsed.network_codec}' (expected opus or pcm).")
+    if parsed.input_type == "file" and parsed.file_path is None:
+        raise ValueError(f"Configuration value missing: 'path' in audio profile '{name}'.")
+
+    return parsed
+
 
 class Configuration:
     def __init__(self, configuration: TOMLConfig):
@@ -17,6 +82,16 @@ class Configuration:
         self._auto_join: TOMLConfig = self._config.get_table("auto_join", raise_on_missing_key=True)
         self._permissions: TOMLConfig = self._config.get_table("permissions", raise_on_missing_key=True)
         self._audio: TOMLConfig = self._config.get_table("audio", raise_on_missing_key=True)
+        self._audio_noise_suppression: TOMLConfig = self._audio.get_table("noise_suppression") or TOMLConfig({})
+        self._audio_network: TOMLConfig = self._audio.get_table("network") or TOMLConfig({})
+        self._audio_file: TOMLConfig = self._audio.get_table("file") or TOMLConfig({})
+        self._audio_pipe: TOMLConfig = self._audio.get_table("pipe") or TOMLConfig({})
+        self._audio_meter: TOMLConfig = self._audio.get_table("meter") or TOMLConfig({})
+        self._event_loop: TOMLConfig = self._config.get_table("event_loop") or TOMLConfig({})
+        self._session: TOMLConfig = self._config.get_table("session") or TOMLConfig({})
+        self._voice: TOMLConfig = self._config.get_table("voice") or TOMLConfig({})
+        self._watchdog: TOMLConfig = self._config.get_table("watchdog") or TOMLConfig({})
+        self._reload: TOMLConfig = self._config.get_table("reload") or TOMLConfig({})
 
         ## "discord" table
         self.BOT_TOKEN: str = self._discord.get("token", raise_on_missing_key=True)
@@ -25,6 +100,7 @@ class Configuration:
         self.AUTO_JOIN_ENABLED: bool = bool(self._auto_join.get("enabled", fallback=False))
         self.AUTO_JOIN_GUILD_ID: Optional[int] = self._auto_join.get("guild_id", fallback=None)
         self.AUTO_JOIN_VOICE_CHANNEL_ID: Optional[int] = self._auto_join.get("voice_channel_id", fallback=None)
+        self.AUTO_JOIN_PROFILE: str = self._auto_join.get("profile", fallback=DEFAULT_INPUT_PROFILE_NAME)
 
         ## "permissions" table
         self.USER_IDS: list[int] = [
@@ -36,10 +112,117 @@ class Configuration:
         ]
 
         ## "audio" table
+        self.AUDIO_INPUT_TYPE: str = self._audio.get("input_type", fallback="device")
+        if self.AUDIO_INPUT_TYPE not in INPUT_TYPES:
+            raise ValueError(f"Invalid audio.input_type: '{self.AUDIO_INPUT_TYPE}' "
+                             f"(expected device, network, file or pipe).")
+
         self.AUDIO_HOST_API_NAME: str = self._audio.get("host_api_name", fallback="Windows WASAPI")
-        self.AUDIO_INPUT_DEVICE_NAME: str = self._audio.get("input_device_name", raise_on_missing_key=True)
+        self.AUDIO_INPUT_DEVICE_NAME: Optional[str] = self._audio.get(
+            "input_device_name", raise_on_missing_key=self.AUDIO_INPUT_TYPE == "device"
+        )
         self.INITIAL_VOLUME: float = clamp(float(self._audio.get("initial_volume", fallback=1.0)), 0, 2)
 
+        ## "audio.noise_suppression" subtable
+        self.NOISE_SUPPRESSION_ENABLED: bool = bool(self._audio_noise_suppression.get("enabled", fallback=False))
+        self.NOISE_SUPPRESSION_REDUCTION_DB: float = clamp(
+            float(self._audio_noise_suppression.get("reduction_db", fallback=12.0)), 0, 40
+        )
+        self.NOISE_SUPPRESSION_LEARNING_SECONDS: float = max(
+            float(self._audio_noise_suppression.get("learning_seconds", fallback=1.0)), 0.1
+        )
+
+        ## "audio.network" subtable
+        self.NETWORK_BIND_HOST: str = self._audio_network.get("bind_host", fallback="0.0.0.0")
+        self.NETWORK_PORT: int = int(self._audio_network.get("port", fallback=50005))
+        self.NETWORK_CODEC: str = self._audio_network.get("codec", fallback="opus")
+        if self.NETWORK_CODEC not in ("opus", "pcm"):
+            raise ValueError(f"Invalid audio.network.codec: '{self.NETWORK_CODEC}' (expected opus or pcm).")
+        self.NETWORK_JITTER_BUFFER_MS: int = clamp(
+            int(self._audio_network.get("jitter_buffer_ms", fallback=60)), 20, 1000
+        )
+
+        ## "audio.file" subtable
+        self.FILE_PATH: Optional[Path] = get_optional_path_from_str(self._audio_file.get("path"))
+        if self.AUDIO_INPUT_TYPE == "file" and self.FILE_PATH is None:
+            raise ValueError("Configuration value missing: 'audio.file.path' (required when input_type is file).")
+        self.FILE_LOOP: bool = bool(self._audio_file.get("loop", fallback=False))
+
+        ## "audio.pipe" subtable
+        self.PIPE_PATH: str = self._audio_pipe.get("path", fallback="-")
+        self.PIPE_BULK_FRAMES: int = clamp(int(self._audio_pipe.get("bulk_frames", fallback=10)), 1, 500)
+
+        ## "audio.meter" subtable
+        self.METER_PEAK_HOLD_SECONDS: float = max(float(self._audio_meter.get("peak_hold_seconds", fallback=10.0)), 0.0)
+        self.METER_CONSOLE_INTERVAL_SECONDS: float = max(
+            float(self._audio_meter.get("console_interval_seconds", fallback=0.0)), 0.0
+        )
+
+        ## "audio.profiles" array of tables
+        # The input configured directly in the "audio" table is always available as the "default" profile.
+        default_profile = InputProfile(
+            name=DEFAULT_INPUT_PROFILE_NAME,
+            input_type=self.AUDIO_INPUT_TYPE,
+            host_api_name=self.AUDIO_HOST_API_NAME,
+            input_device_name=self.AUDIO_INPUT_DEVICE_NAME,
+            network_bind_host=self.NETWORK_BIND_HOST,
+            network_port=self.NETWORK_PORT,
+            network_codec=self.NETWORK_CODEC,
+            network_jitter_buffer_ms=self.NETWORK_JITTER_BUFFER_MS,
+            file_path=self.FILE_PATH,
+            file_loop=self.FILE_LOOP,
+            pipe_path=self.PIPE_PATH,
+            pipe_bulk_frames=self.PIPE_BULK_FRAMES,
+        )
+        self.INPUT_PROFILES: dict[str, InputProfile] = {DEFAULT_INPUT_PROFILE_NAME: default_profile}
+        for profile_data in self._audio.get("profiles", fallback=[]):
+            profile = _parse_input_profile(TOMLConfig(profile_data), default_profile)
+            if profile.name in self.INPUT_PROFILES:
+                raise ValueError(f"Audio profile names must be unique, '{profile.name}' is used more than once.")
+            self.INPUT_PROFILES[profile.name] = profile
+
+        if self.AUTO_JOIN_PROFILE not in self.INPUT_PROFILES:
+            raise ValueError(f"Invalid auto_join.profile: no audio profile named '{self.AUTO_JOIN_PROFILE}'.")
+
+        ## "event_loop" table
+        self.EVENT_LOOP_USE_UVLOOP: bool = bool(self._event_loop.get("use_uvloop", fallback=True))
+        self.EVENT_LOOP_LAG_MONITOR_ENABLED: bool = bool(self._event_loop.get("lag_monitor_enabled", fallback=True))
+        self.EVENT_LOOP_LAG_WARNING_MS: float = max(
+            float(self._event_loop.get("lag_warning_ms", fallback=100.0)), 10.0
+        )
+        self.EVENT_LOOP_LAG_REPORT_INTERVAL_SECONDS: float = max(
+            float(self._event_loop.get("lag_report_interval_seconds", fallback=600.0)), 0.0
+        )
+
+        ## "session" table
+        self.SESSION_RESTORE_ENABLED: bool = bool(self._session.get("restore", fallback=True))
+        # None means next to the configuration file (see below), so instances don't share a session file.
+        self.SESSION_PATH: Optional[Path] = get_optional_path_from_str(self._session.get("path"))
+
+        ## "voice" table
+        self.VOICE_RECONNECT_ENABLED: bool = bool(self._voice.get("reconnect", fallback=True))
+        self.VOICE_RECONNECT_MAX_ATTEMPTS: int = max(int(self._voice.get("reconnect_max_attempts", fallback=10)), 1)
+        self.VOICE_RECONNECT_INITIAL_DELAY_SECONDS: float = max(
+            float(self._voice.get("reconnect_initial_delay_seconds", fallback=1.0)), 0.1
+        )
+        self.VOICE_RECONNECT_MAX_DELAY_SECONDS: float = max(
+            float(self._voice.get("reconnect_max_delay_seconds", fallback=60.0)),
+            self.VOICE_RECONNECT_INITIAL_DELAY_SECONDS
+        )
+
+        ## "watchdog" table
+        self.WATCHDOG_ENABLED: bool = bool(self._watchdog.get("enabled", fallback=True))
+        self.WATCHDOG_STALL_THRESHOLD_SECONDS: float = max(
+            float(self._watchdog.get("stall_threshold_seconds", fallback=2.0)), 0.2
+        )
+        self.WATCHDOG_NOTIFY_USERS: bool = bool(self._watchdog.get("notify_users", fallback=True))
+
+        ## "reload" table
+        self.RELOAD_ENABLED: bool = bool(self._reload.get("enabled", fallback=True))
+        self.RELOAD_POLL_INTERVAL_SECONDS: float = max(
+            float(self._reload.get("poll_interval_seconds", fallback=2.0)), 0.5
+        )
+
     @classmethod
     def from_file_path(cls, configuration_filepath: Union[str, Path]) -> "Configuration":
         """
@@ -51,7 +234,7 @@ class Configuration:
         return cls(TOMLConfig.from_filename(str(configuration_filepath)))
 
 
-config_path = DATA_DIR / "configuration.toml"
+config_path = Path(os.environ.get(CONFIGURATION_PATH_ENV, DATA_DIR / "configuration.toml"))
 config_template_path = DATA_DIR / "configuration.TEMPLATE.toml"
 
 if not config_path.exists() and config_template_path.exists():
@@ -59,4 +242,16 @@ if not config_path.exists() and config_template_path.exists():
         "Missing configuration.toml! Make sure to make a copy of configuration.TEMPLATE.toml and configure it."
     )
 
-config = Configuration.from_file_path(config_path)
+
+def load_configuration(configuration_filepath: Path) -> Configuration:
+    """
+    Read and validate a configuration file (also used to reload it, see core.configuration_reload).
+    """
+    configuration = Configuration.from_file_path(configuration_filepath)
+    if configuration.SESSION_PATH is None:
+        configuration.SESSION_PATH = configuration_filepath.with_suffix(".session.json")
+
+    return configuration
+
+
+config = load_configuration(config_path)
@@ -12,6 +12,10 @@ DATA_DIR = BASE_DIR / "data"
 if not DATA_DIR.exists():
     raise FileNotFoundError("Missing directory: data!")
 
+# Environment variable that overrides the configuration file path
+# (allows running multiple instances with different configuration files, see supervisor.py).
+CONFIGURATION_PATH_ENV = "AUDIOPHAGE_CONFIGURATION"
+
 
 # Utility functions for parsing configuration values.
 def _get_optional_path_from_string(path_string: Optional[str]) -> Optional[Path]:
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+from .configuration import Configuration, load_configuration
+
+log = logging.getLogger(__name__)
+
+# Settings that are only read on startup (or by objects created on startup): changes are not applied until a restart.
+RESTART_REQUIRED_SETTINGS: frozenset[str] = frozenset({
+    "BOT_TOKEN",
+    # Slash commands are registered for these guilds on startup.
+    "GUILD_IDS",
+    "SESSION_PATH",
+    # The session is only restored on startup.
+    "SESSION_RESTORE_ENABLED",
+    "EVENT_LOOP_USE_UVLOOP",
+    "EVENT_LOOP_LAG_MONITOR_ENABLED",
+    "EVENT_LOOP_LAG_WARNING_MS",
+    "EVENT_LOOP_LAG_REPORT_INTERVAL_SECONDS",
+    "METER_PEAK_HOLD_SECONDS",
+    "METER_CONSOLE_INTERVAL_SECONDS",
+    "WATCHDOG_ENABLED",
+    "WATCHDOG_STALL_THRESHOLD_SECONDS",
+    "RELOAD_ENABLED",
+    "RELOAD_POLL_INTERVAL_SECONDS",
+})
+
+# Setting name -> (old value, new value)
+ConfigurationDiff = dict[str, tuple[Any, Any]]
+
+
+def diff_configurations(old: Configuration, new: Configuration) -> ConfigurationDiff:
+    """
+    Compare the settings (the upper case attributes) of two configurations.
+    """
+    old_settings: dict[str, Any] = {name: value for name, value in vars(old).items() if name.isupper()}
+    new_settings: dict[str, Any] = {name: value for name, value in vars(new).items() if name.isupper()}
+
+    return {
+        name: (old_settings.get(name), new_settings.get(name))
+        for name in old_settings.keys() | new_settings.keys()
+        if old_settings.get(name) != new_settings.get(name)
+    }
+
+
+class ConfigurationWatcher:
+    """
+    Watches the configuration file for changes (by polling its modification time and size) and applies them
+    to the live Configuration instance in place, so everything holding a reference to it sees the new values
+    right away. A changed file is first parsed and validated in full; if that fails, the running configuration
+    is left untouched.
+
+    Only settings that changed are applied (except the RESTART_REQUIRED_SETTINGS, which are only reported),
+    then `on_change` is called with the applied diff, to act on changes that need more than a new value
+    (e.g. reopening inputs).
+    """
+    __slots__ = ("_configuration", "_path", "_on_change", "_poll_interval", "_file_state", "_is_running")
+
+    def __init__(
+            self,
+            configuration: Configuration,
+            path: Path,
+            on_change: Callable[[ConfigurationDiff], Awaitable[None]],
+            poll_interval: float = 2.0,
+    ):
+        """
+        :param configuration: The live configuration to update.
+        :param path: Path of the configuration file.
+        :param on_change: Called with the applied changes after each successful reload.
+        :param poll_interval: How often to check the file for changes, in seconds.
+        """
+        self._configuration: Configuration = configuration
+        self._path: Path = path
+        self._on_change: Callable[[ConfigurationDiff], Awaitable[None]] = on_change
+        self._poll_interval: float = poll_interval
+        self._file_state: Optional[tuple[int, int]] = self._read_file_state()
+        self._is_running: bool = False
+
+    def _read_file_state(self) -> Optional[tuple[int, int]]:
+        try:
+            stat = os.stat(self._path)
+        except OSError:
+            return None
+
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self) -> Optional[ConfigurationDiff]:
+        """
+        Read the configuration file and apply the changes.
+
+        :return: The applied changes, or None if the file couldn't be read or is invalid.
+        """
+        try:
+            new_configuration: Configuration = load_configuration(self._path)
+        except Exception as err:
+            # Whatever is wrong with the file (a missing table, a value of the wrong type, ...) mustn't end the watcher.
+            log.error(f"Not reloading the configuration, {self._path} is invalid: {err!r}")
+            return None
+
+        changes: ConfigurationDiff = diff_configurations(self._configuration, new_configuration)
+
+        restart_required: list[str] = sorted(name for name in changes if name in RESTART_REQUIRED_SETTINGS)
+        if len(restart_required) > 0:
+            log.warning(f"Changes to {', '.join(restart_required)} will only apply after a restart.")
+
+        applied: ConfigurationDiff = {
+            name: change for name, change in changes.items() if name not in RESTART_REQUIRED_SETTINGS
+        }
+        for name, (_, new_value) in applied.items():
+            setattr(self._configuration, name, new_value)
+
+        if len(applied) > 0:
+            log.info(f"Reloaded the configuration, changed: {', '.join(sorted(applied))}.")
+        else:
+            log.info("Reloaded the configuration, nothing to apply.")
+
+        return applied
+
+    async def run(self):
+        """
+        Watch the configuration file until stop() is called or the task is cancelled.
+        """
+        self._is_running = True
+        log.info(f"Watching {self._path} for changes.")
+
+        while self._is_running:
+            await asyncio.sleep(self._poll_interval)
+
+            file_state = self._read_file_state()
+            if file_state is None or file_state == self._file_state:
+                continue
+
+            # Editors often write a file in several steps, wait until it stops changing.
+            await asyncio.sleep(0.2)
+            settled_file_state = self._read_file_state()
+            if settled_file_state != file_state:
+                continue
+            self._file_state = file_state
+
+            applied: Optional[ConfigurationDiff] = self.reload()
+            if applied:
+                try:
+                    await self._on_change(applied)
+                except Exception as err:
+                    log.error(f"Couldn't apply the reloaded configuration: {err!r}")
+
+    def stop(self):
+        self._is_running = False
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import statistics
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+
+def install_uvloop() -> bool:
+    """
+    Make asyncio use uvloop's (faster) event loop implementation, if it is installed.
+    Must be called before the event loop is created (i.e. before client.run).
+
+    :return: Whether uvloop is now being used.
+    """
+    try:
+        import uvloop
+    except ImportError:
+        # uvloop is an optional dependency and isn't available on Windows at all.
+        log.info("uvloop is not installed, using the default asyncio event loop.")
+        return False
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    log.info(f"Using the uvloop event loop (uvloop {uvloop.__version__}).")
+    return True
+
+
+def _format_stack(frame, limit: int = 8) -> str:
+    return "".join(traceback.format_stack(frame)[-limit:]).rstrip()
+
+
+class EventLoopLagMonitor:
+    """
+    Measures how late the asyncio event loop runs a callback that was scheduled to run every `interval` seconds
+    (the scheduling delay every other callback - commands, gateway events, voice keepalives - experiences as well).
+
+    A watcher thread captures the stack of the event loop thread while it's stalled, so the warning logged
+    once a stall exceeds `warning_threshold` shows which callback was blocking the loop.
+    Lag percentiles are logged every `report_interval` seconds.
+    """
+    __slots__ = (
+        "_interval", "_warning_threshold", "_report_interval", "_samples",
+        "_loop_thread_ident", "_last_tick", "_tick_count", "_stall_stack", "_is_running",
+    )
+
+    def __init__(
+            self,
+            interval: float = 0.05,
+            warning_threshold: float = 0.1,
+            report_interval: float = 600.0,
+            max_samples: int = 100_000,
+    ):
+        """
+        :param interval: Time between lag samples, in seconds.
+        :param warning_threshold: Lag (in seconds) above which a warning is logged.
+        :param report_interval: Time between percentile reports, in seconds (0 disables them).
+        :param max_samples: Maximum amount of recent samples to keep for percentiles.
+        """
+        self._interval: float = interval
+        self._warning_threshold: float = warning_threshold
+        self._report_interval: float = report_interval
+        self._samples: deque[float] = deque(maxlen=max_samples)
+
+        self._loop_thread_ident: Optional[int] = None
+        self._last_tick: float = 0
+        self._tick_count: int = 0
+        # Tick count at the time of the capture and the formatted stack of the stalled event loop thread.
+        self._stall_stack: Optional[tuple[int, str]] = None
+        self._is_running: bool = False
+
+    def percentiles(self) -> Optional[dict[str, float]]:
+        """
+        :return: Median, 95th and 99th percentile and maximum lag (in seconds) of the recent samples
+                 or None if there are not enough samples yet.
+        """
+        samples = list(self._samples)
+        if len(samples) < 2:
+            return None
+
+        quantiles = statistics.quantiles(samples, n=100, method="inclusive")
+        return {
+            "p50": quantiles[49],
+            "p95": quantiles[94],
+            "p99": quantiles[98],
+            "max": max(samples),
+        }
+
+    def format_report(self) -> str:
+        percentiles = self.percentiles()
+        if percentiles is None:
+            return "Event loop lag: not enough samples yet."
+
+        return f"Event loop lag over the last {len(self._samples)} samples: " + ", ".join(
+            f"{name} {value * 1000:.1f} ms" for name, value in percentiles.items()
+        ) + "."
+
+    def _watch(self):
+        # Poll often enough to catch any stall longer than the warning threshold while it's still happening.
+        poll_interval: float = min(self._interval, self._warning_threshold) / 2
+
+        while self._is_running:
+            time.sleep(poll_interval)
+
+            stalled_for = time.monotonic() - self._last_tick
+            tick_count = self._tick_count
+            if stalled_for < self._interval + self._warning_threshold:
+                continue
+            if self._stall_stack is not None and self._stall_stack[0] == tick_count:
+                # Already captured during this stall.
+                continue
+
+            # noinspection PyProtectedMember
+            frame = sys._current_frames().get(self._loop_thread_ident)
+            if frame is not None:
+                self._stall_stack = (tick_count, _format_stack(frame))
+            del frame
+
+    async def run(self):
+        """
+        Sample the lag of the running event loop until stop() is called or the task is cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        self._loop_thread_ident = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._is_running = True
+
+        threading.Thread(target=self._watch, name="audiophage-loop-lag-watcher", daemon=True).start()
+        log.info(f"Monitoring event loop lag (warning threshold: {self._warning_threshold * 1000:.0f} ms).")
+
+        next_report: float = loop.time() + self._report_interval
+        try:
+            while self._is_running:
+                expected = loop.time() + self._interval
+                await asyncio.sleep(self._interval)
+                lag = max(loop.time() - expected, 0.0)
+
+                self._last_tick = time.monotonic()
+                self._tick_count += 1
+                self._samples.append(lag)
+
+                if lag > self._warning_threshold:
+                    stall_stack = self._stall_stack
+                    if stall_stack is not None and stall_stack[0] == self._tick_count - 1:
+                        log.warning(f"Event loop was blocked for {lag * 1000:.0f} ms, "
+                                    f"while running:\n{stall_stack[1]}")
+                    else:
+                        log.warning(f"Event loop was blocked for {lag * 1000:.0f} ms (no stack was captured).")
+
+                if self._report_interval > 0 and loop.time() >= next_report:
+                    log.info(self.format_report())
+                    next_report = loop.time() + self._report_interval
+        finally:
+            self._is_running = False
+
+    def stop(self):
+        self._is_running = False
@@ -0,0 +1,234 @@
+import logging
+import mmap
+import struct
+import sys
+from pathlib import Path
+from typing import BinaryIO, Union
+
+from .buffers import FrameBuffer, FRAME_SIZE
+from .exceptions import AudioException
+from .input_source import InputSource
+
+log = logging.getLogger(__name__)
+
+WAVE_FORMAT_PCM: int = 0x0001
+WAVE_FORMAT_EXTENSIBLE: int = 0xFFFE
+
+
+def _find_wave_data(data: mmap.mmap, file_path: Path) -> tuple[int, int]:
+    """
+    Validate the header of a (memory-mapped) WAV file and locate its sample data.
+
+    :return: Offset and length of the "data" chunk.
+    """
+    if len(data) < 12 or data[0:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise AudioException(f"{file_path.name} is not a WAV file.")
+
+    offset: int = 12
+    format_checked: bool = False
+    while offset + 8 <= len(data):
+        chunk_id: bytes = data[offset:offset + 4]
+        chunk_size: int = struct.unpack_from("<I", data, offset + 4)[0]
+        chunk_start: int = offset + 8
+
+        if chunk_id == b"fmt ":
+            audio_format, channels, sample_rate, _, _, bits_per_sample = struct.unpack_from("<HHIIHH", data, chunk_start)
+            if audio_format == WAVE_FORMAT_EXTENSIBLE:
+                # The actual format is the first two bytes of the sub-format GUID.
+                audio_format = struct.unpack_from("<H", data, chunk_start + 24)[0]
+
+            if (audio_format, channels, sample_rate, bits_per_sample) != (WAVE_FORMAT_PCM, 2, 48000, 16):
+                raise AudioException(f"{file_path.name} must be 16-bit 48 kHz stereo PCM, got: format {audio_format}, "
+                                     f"{channels} channels, {sample_rate} Hz, {bits_per_sample}-bit.")
+            format_checked = True
+
+        elif chunk_id == b"data":
+            if not format_checked:
+                raise AudioException(f"{file_path.name} has no format chunk before its data.")
+            return chunk_start, min(chunk_size, len(data) - chunk_start)
+
+        # Chunks are padded to an even size.
+        offset = chunk_start + chunk_size + (chunk_size & 1)
+
+    raise AudioException(f"{file_path.name} has no data chunk.")
+
+
+class FileInputSource(InputSource):
+    """
+    A discord AudioSource that plays a WAV (or raw 16-bit 48 kHz stereo little-endian PCM) file.
+    The file is memory-mapped and each frame is copied straight from the mapping into a pooled FrameBuffer
+    (no read calls or intermediate bytes objects).
+    Pacing to real time is left to the discord AudioPlayer, which reads a frame every 20 ms.
+    """
+    __slots__ = ("_file", "_mmap", "_view", "_data_start", "_data_end", "_position", "_loop", "_is_closed")
+
+    def __init__(self, file: BinaryIO, file_path: Path, loop: bool):
+        """
+        :param file: File opened in binary mode.
+        :param file_path: Path of the file (".wav" files are parsed, anything else is read as raw PCM).
+        :param loop: Whether to start from the beginning when the end of the file is reached.
+        """
+        super().__init__()
+
+        self._file: BinaryIO = file
+        self._mmap: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            if file_path.suffix.lower() == ".wav":
+                data_start, data_length = _find_wave_data(self._mmap, file_path)
+            else:
+                data_start, data_length = 0, len(self._mmap)
+        except AudioException:
+            self._mmap.close()
+            raise
+
+        if data_length < FRAME_SIZE:
+            self._mmap.close()
+            raise AudioException(f"{file_path.name} contains less than 20 ms of audio.")
+
+        log.debug(f"New FileInputSource: {file_path.name}, {data_length / (FRAME_SIZE * 50):.1f} s of audio.")
+
+        self._view: memoryview = memoryview(self._mmap)
+        self._data_start: int = data_start
+        # Only whole frames are played.
+        self._data_end: int = data_start + data_length - data_length % FRAME_SIZE
+        self._position: int = data_start
+        self._loop: bool = loop
+        self._is_closed: bool = False
+
+    @classmethod
+    def create(cls, file_path: Union[str, Path], loop: bool = False) -> "FileInputSource":
+        """
+        Open and memory-map an audio file and instantiate a new FileInputSource.
+
+        :param file_path: WAV or raw PCM file to play.
+        :param loop: Whether to play the file in a loop.
+        :return: FileInputSource instance that can be passed over to VoiceClient.play.
+        """
+        file_path = Path(file_path)
+        try:
+            file = file_path.open(mode="rb")
+        except OSError as err:
+            raise AudioException(f"Can't open {file_path}: {err}")
+
+        try:
+            return cls(file, file_path, loop)
+        except (AudioException, ValueError, OSError) as err:
+            file.close()
+            if isinstance(err, AudioException):
+                raise
+            raise AudioException(f"Can't memory-map {file_path}: {err}")
+
+    def read_into(self, buffer: FrameBuffer) -> bool:
+        """
+        Copy the next 20 ms of audio straight from the mapped file into the buffer.
+        Returns False at the end of the file (unless looping), which stops the player.
+        """
+        if self._is_closed:
+            return False
+
+        if self._position >= self._data_end:
+            if not self._loop:
+                return False
+            self._position = self._data_start
+
+        buffer.view[:] = self._view[self._position:self._position + FRAME_SIZE]
+        self._position += FRAME_SIZE
+        return True
+
+    def is_opus(self) -> bool:
+        return False
+
+    def cleanup(self) -> None:
+        if self._is_closed:
+            return
+        self._is_closed = True
+
+        try:
+            self._view.release()
+            self._mmap.close()
+        except BufferError:
+            # A frame is being copied out of the mapping right now (cleanup from another thread),
+            # the mapping will be closed once it's garbage collected.
+            pass
+
+        self._file.close()
+
+
+class PipeInputSource(InputSource):
+    """
+    A discord AudioSource that reads raw 16-bit 48 kHz stereo little-endian PCM from the standard input or a FIFO
+    (named pipe). Reads are done in bulk (up to `bulk_frames` frames per system call) into a fixed buffer
+    and frames are copied from it into pooled FrameBuffers.
+    """
+    __slots__ = ("_pipe", "_buffer", "_view", "_start", "_end", "_is_closed")
+
+    def __init__(self, pipe: BinaryIO, bulk_frames: int = 10):
+        """
+        :param pipe: Unbuffered binary file object to read from.
+        :param bulk_frames: Maximum amount of 20 ms frames to read with a single system call.
+        """
+        super().__init__()
+        log.debug(f"New PipeInputSource: {bulk_frames=}.")
+
+        self._pipe: BinaryIO = pipe
+        self._buffer: bytearray = bytearray(FRAME_SIZE * max(bulk_frames, 1))
+        self._view: memoryview = memoryview(self._buffer)
+        # Unread data is in self._buffer[self._start:self._end].
+        self._start: int = 0
+        self._end: int = 0
+        self._is_closed: bool = False
+
+    @classmethod
+    def create(cls, pipe_path: str, bulk_frames: int = 10) -> "PipeInputSource":
+        """
+        Open a FIFO (or the standard input, if pipe_path is "-") and instantiate a new PipeInputSource.
+
+        :param pipe_path: FIFO / named pipe path or "-" for the standard input.
+        :param bulk_frames: Maximum amount of 20 ms frames to read with a single system call.
+        :return: PipeInputSource instance that can be passed over to VoiceClient.play.
+        """
+        if pipe_path == "-":
+            return cls(open(sys.stdin.fileno(), mode="rb", buffering=0, closefd=False), bulk_frames)
+
+        try:
+            pipe = open(pipe_path, mode="rb", buffering=0)
+        except OSError as err:
+            raise AudioException(f"Can't open {pipe_path}: {err}")
+
+        return cls(pipe, bulk_frames)
+
+    def read_into(self, buffer: FrameBuffer) -> bool:
+        """
+        Copy the next 20 ms of audio into the buffer. Blocks until a whole frame is available and returns False
+        once the writer closes the pipe, which stops the player.
+        """
+        if self._is_closed:
+            return False
+
+        if self._end - self._start < FRAME_SIZE:
+            # Move the leftover partial frame to the front and fill the rest of the buffer.
+            leftover: int = self._end - self._start
+            self._view[:leftover] = self._view[self._start:self._end]
+            self._start, self._end = 0, leftover
+
+            while self._end < FRAME_SIZE:
+                read_bytes = self._pipe.readinto(self._view[self._end:])
+                if not read_bytes:
+                    log.info("Input pipe was closed by the writer.")
+                    return False
+                self._end += read_bytes
+
+        buffer.view[:] = self._view[self._start:self._start + FRAME_SIZE]
+        self._start += FRAME_SIZE
+        return True
+
+    def is_opus(self) -> bool:
+        return False
+
+    def cleanup(self) -> None:
+        if self._is_closed:
+            return
+        self._is_closed = True
+
+        self._pipe.close()
@@ -0,0 +1,60 @@
+from typing import Optional, Union
+
+from discord import AudioSource
+
+from .buffers import FrameBuffer, FrameBufferPool
+from .profiling import DeterministicProfiler, PROFILED_THREAD_CAPTURE
+
+
+class InputSource(AudioSource):
+    """
+    Base class for Audiophage input sources - the AudioSource at the start of the audio pipeline.
+
+    PCM sources implement `read_into`, which fills a FrameBuffer from the source's pool; `read` then hands out
+    that (reused) buffer instead of allocating a new bytes object for every frame.
+    """
+    __slots__ = ("_profiler", "_pool")
+
+    # Whether `read` blocks until the next frame is available in real time (e.g. an audio device driven by its own
+    # clock). Sources that return frames right away are paced by whoever reads them.
+    is_clocked: bool = False
+
+    def __init__(self, pool_size: int = 4):
+        """
+        :param pool_size: Amount of FrameBuffers to cycle through.
+        """
+        self._profiler: Optional[DeterministicProfiler] = None
+        self._pool: FrameBufferPool = FrameBufferPool(pool_size)
+
+    def attach_profiler(self, profiler: DeterministicProfiler):
+        """
+        Attach a DeterministicProfiler that will be driven from the thread calling `read` (the capture thread,
+        see core.capture). The profiler detaches itself once it has finished.
+        """
+        self._profiler = profiler
+
+    def _on_frame(self):
+        if not self._profiler.on_frame(PROFILED_THREAD_CAPTURE):
+            self._profiler = None
+
+    def read_into(self, buffer: FrameBuffer) -> bool:
+        """
+        Fill the buffer with the next 20 ms of audio.
+
+        :return: False if the stream has ended (the buffer contents are then undefined).
+        """
+        raise NotImplementedError
+
+    def read(self) -> Union[FrameBuffer, bytes]:
+        """
+        Read 20 ms worth of audio into the next pooled FrameBuffer (3840 bytes).
+        Returns an empty bytes object once the stream has ended, which stops the player.
+        """
+        if self._profiler is not None:
+            self._on_frame()
+
+        buffer = self._pool.acquire()
+        if not self.read_into(buffer):
+            return b""
+
+        return buffer
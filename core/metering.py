@@ -0,0 +1,111 @@
+import math
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from .buffers import CHANNELS, FRAME_SAMPLES
+
+# RMS is estimated from every 4th sample (12 kHz), which is plenty for a level reading.
+RMS_DECIMATION: int = 4
+# A frame containing a sample at full scale counts as clipped.
+CLIP_LEVEL: int = 32767
+METER_FLOOR_DBFS: float = -60.0
+
+
+def to_dbfs(value: float) -> float:
+    # Digital silence is reported as the 16-bit noise floor (-90.3 dBFS), adding 0.0 turns a rounded -0.0 into 0.0.
+    return round(20 * math.log10(max(value, 1.0) / 32768), 1) + 0.0
+
+
+@dataclass(eq=True, frozen=True)
+class MeterReading:
+    peak_dbfs: float
+    rms_dbfs: float
+    peak_hold_dbfs: float
+    # Frames that contained a sample at full scale (since the stream started or the meter was reset).
+    clip_count: int
+    frames_metered: int
+
+
+def format_meter_bar(dbfs: float, width: int = 24) -> str:
+    """
+    Draw a level as a text bar from METER_FLOOR_DBFS to 0 dBFS.
+    """
+    filled: int = round(width * (1 - min(max(dbfs, METER_FLOOR_DBFS), 0.0) / METER_FLOOR_DBFS))
+    return "#" * filled + "-" * (width - filled)
+
+
+def format_reading(reading: MeterReading) -> str:
+    return f"[{format_meter_bar(reading.peak_dbfs)}] peak {reading.peak_dbfs:6.1f} dBFS, " \
+           f"RMS {reading.rms_dbfs:6.1f} dBFS, hold {reading.peak_hold_dbfs:6.1f} dBFS, " \
+           f"{reading.clip_count} clipped frames"
+
+
+class LevelMeter:
+    """
+    Peak and RMS meter for the processed frames of a stream (run by the capture thread on every frame).
+
+    The peak is taken from every sample (so no clipped sample is missed) and the RMS from every
+    RMS_DECIMATION-th sample, each with a single vectorized call and no allocations besides numpy scalars:
+    a few microseconds per frame, a fraction of a percent of the 20 ms frame budget
+    (see benchmarks/metering.py). Readings are taken from other threads with `reading()`.
+    """
+    __slots__ = (
+        "_peak_hold_seconds", "_scratch", "_scratch_flat",
+        "_peak", "_rms", "_peak_hold", "_peak_hold_at", "_clip_count", "_frames_metered",
+    )
+
+    def __init__(self, peak_hold_seconds: float = 10.0):
+        """
+        :param peak_hold_seconds: How long the highest peak is held before the hold falls back to the current peak.
+        """
+        self._peak_hold_seconds: float = peak_hold_seconds
+        self._scratch: np.ndarray = np.zeros((FRAME_SAMPLES // RMS_DECIMATION, CHANNELS), dtype=np.float32)
+        self._scratch_flat: np.ndarray = self._scratch.reshape(-1)
+
+        self._peak: int = 0
+        self._rms: float = 0.0
+        self._peak_hold: int = 0
+        self._peak_hold_at: float = 0.0
+        self._clip_count: int = 0
+        self._frames_metered: int = 0
+
+    def measure(self, samples: np.ndarray):
+        """
+        Meter a frame.
+
+        :param samples: (960, 2) int16 array of the frame (see FrameBuffer.samples).
+        """
+        peak: int = max(int(samples.max()), -int(samples.min()))
+
+        scratch_flat = self._scratch_flat
+        np.copyto(self._scratch, samples[::RMS_DECIMATION])
+        self._rms = math.sqrt(float(np.dot(scratch_flat, scratch_flat)) / scratch_flat.size)
+
+        now: float = time.monotonic()
+        if peak >= self._peak_hold or now - self._peak_hold_at > self._peak_hold_seconds:
+            self._peak_hold = peak
+            self._peak_hold_at = now
+        if peak >= CLIP_LEVEL:
+            self._clip_count += 1
+
+        self._peak = peak
+        self._frames_metered += 1
+
+    def reading(self) -> MeterReading:
+        return MeterReading(
+            peak_dbfs=to_dbfs(self._peak),
+            rms_dbfs=to_dbfs(self._rms),
+            peak_hold_dbfs=to_dbfs(self._peak_hold),
+            clip_count=self._clip_count,
+            frames_metered=self._frames_metered,
+        )
+
+    def reset(self):
+        """
+        Reset the peak hold and clip count.
+        """
+        self._peak_hold = self._peak
+        self._peak_hold_at = time.monotonic()
+        self._clip_count = 0
@@ -0,0 +1,328 @@
+import logging
+import socket
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, Literal, Union
+
+from .buffers import FrameBuffer, FRAME_SIZE
+from .exceptions import AudioException
+from .input_source import InputSource
+
+log = logging.getLogger(__name__)
+
+RTP_VERSION: int = 2
+RTP_HEADER = struct.Struct(">BBHII")
+# Dynamic RTP payload types used by Audiophage (see network-sender.py).
+RTP_PAYLOAD_TYPE_OPUS: int = 96
+RTP_PAYLOAD_TYPE_PCM: int = 97
+
+# Every RTP packet carries exactly one 20 ms frame: a single Opus packet or 16-bit 48 kHz stereo little-endian PCM.
+FRAME_DURATION_MS: int = 20
+PCM_FRAME_SIZE: int = FRAME_SIZE
+OPUS_SILENCE: bytes = b"\xf8\xff\xfe"
+
+NetworkCodec = Literal["opus", "pcm"]
+
+
+@dataclass(eq=True, frozen=True)
+class RTPPacket:
+    payload_type: int
+    sequence: int
+    timestamp: int
+    ssrc: int
+    payload: bytes
+
+
+def pack_rtp_packet(payload_type: int, sequence: int, timestamp: int, ssrc: int, payload: bytes) -> bytes:
+    """
+    Build a minimal RTP packet (no padding, extensions or CSRCs).
+    """
+    return RTP_HEADER.pack(
+        RTP_VERSION << 6,
+        payload_type & 0x7F,
+        sequence & 0xFFFF,
+        timestamp & 0xFFFFFFFF,
+        ssrc & 0xFFFFFFFF,
+    ) + payload
+
+
+def parse_rtp_packet(data: bytes) -> Optional[RTPPacket]:
+    """
+    Parse an RTP packet, skipping any CSRCs, header extension and padding.
+
+    :return: RTPPacket or None if the data is not a valid RTP packet.
+    """
+    if len(data) < RTP_HEADER.size:
+        return None
+
+    first_byte, second_byte, sequence, timestamp, ssrc = RTP_HEADER.unpack_from(data)
+    if first_byte >> 6 != RTP_VERSION:
+        return None
+
+    payload_start: int = RTP_HEADER.size + (first_byte & 0x0F) * 4
+    if first_byte & 0x10:
+        # Header extension: 16-bit profile, 16-bit length (in 32-bit words), extension data.
+        if len(data) < payload_start + 4:
+            return None
+        extension_length: int = struct.unpack_from(">H", data, payload_start + 2)[0]
+        payload_start += 4 + extension_length * 4
+
+    payload_end: int = len(data)
+    if first_byte & 0x20:
+        payload_end -= data[-1]
+
+    if payload_start > payload_end:
+        return None
+
+    return RTPPacket(
+        payload_type=second_byte & 0x7F,
+        sequence=sequence,
+        timestamp=timestamp,
+        ssrc=ssrc,
+        payload=data[payload_start:payload_end],
+    )
+
+
+def _sequence_difference(a: int, b: int) -> int:
+    """
+    Difference between two 16-bit RTP sequence numbers, taking wraparound into account.
+    """
+    return ((a - b + 0x8000) & 0xFFFF) - 0x8000
+
+
+class JitterBuffer:
+    """
+    Reorders incoming RTP packets by sequence number and releases them one by one once `depth` packets are buffered.
+    On underrun it buffers up to `depth` packets again. `put` and `get` can be called from different threads.
+    """
+    __slots__ = (
+        "_depth", "_packets", "_next_sequence", "_ssrc", "_is_buffering", "_lock",
+        "received", "lost", "late", "underruns",
+    )
+
+    def __init__(self, depth: int):
+        """
+        :param depth: Amount of packets to buffer before starting playback (the latency added is depth * 20 ms).
+        """
+        self._depth: int = max(depth, 1)
+        self._packets: dict[int, bytes] = {}
+        self._next_sequence: Optional[int] = None
+        self._ssrc: Optional[int] = None
+        self._is_buffering: bool = True
+        self._lock: threading.Lock = threading.Lock()
+
+        self.received: int = 0
+        self.lost: int = 0
+        self.late: int = 0
+        self.underruns: int = 0
+
+    def _oldest_sequence(self) -> int:
+        reference: int = next(iter(self._packets))
+        return min(self._packets, key=lambda sequence: _sequence_difference(sequence, reference))
+
+    def put(self, packet: RTPPacket):
+        with self._lock:
+            if packet.ssrc != self._ssrc:
+                # A new stream (e.g. the sender was restarted).
+                if self._ssrc is not None:
+                    log.info(f"RTP stream changed (SSRC {self._ssrc:#x} -> {packet.ssrc:#x}), resetting.")
+                self._ssrc = packet.ssrc
+                self._packets.clear()
+                self._next_sequence = None
+                self._is_buffering = True
+
+            if self._next_sequence is not None and _sequence_difference(packet.sequence, self._next_sequence) < 0:
+                self.late += 1
+                return
+
+            self._packets[packet.sequence] = packet.payload
+            self.received += 1
+
+            # Don't let latency build up if the sender is (slightly) faster than us: skip ahead to `depth` packets.
+            if len(self._packets) > self._depth * 2:
+                while len(self._packets) > self._depth:
+                    self._packets.pop(self._oldest_sequence())
+                self._next_sequence = self._oldest_sequence()
+
+    def get(self) -> Optional[bytes]:
+        """
+        :return: The next payload or None if it is missing (lost, not yet received or still buffering).
+        """
+        with self._lock:
+            if self._is_buffering:
+                if len(self._packets) < self._depth:
+                    return None
+
+                self._is_buffering = False
+                oldest: int = self._oldest_sequence()
+                if self._next_sequence is None or _sequence_difference(oldest, self._next_sequence) > 0:
+                    self._next_sequence = oldest
+
+            payload: Optional[bytes] = self._packets.pop(self._next_sequence, None)
+            if payload is None:
+                if len(self._packets) == 0:
+                    self.underruns += 1
+                    self._is_buffering = True
+                    return None
+
+                self.lost += 1
+
+            self._next_sequence = (self._next_sequence + 1) & 0xFFFF
+            return payload
+
+
+class NetworkInputSource(InputSource):
+    """
+    A discord AudioSource that receives RTP packets over UDP (see network-sender.py).
+    Opus payloads are passed straight through to discord (no decoding or re-encoding),
+    PCM payloads are copied into pooled FrameBuffers.
+
+    Reads are paced to one frame every 20 ms, like an audio device: each frame is taken from the jitter buffer
+    at its deadline, so the reader can't run ahead of the sender (filling the capture queue with silence
+    and adding latency on top of the jitter buffer).
+    """
+    __slots__ = (
+        "_socket", "_codec", "_payload_type", "_jitter_buffer", "_receiver_thread", "_is_closed", "_next_frame_at",
+    )
+
+    is_clocked: bool = True
+
+    def __init__(self, sock: socket.socket, codec: NetworkCodec, jitter_buffer_ms: int):
+        """
+        Given a bound UDP socket, create a new NetworkInputSource that can be passed over to VoiceClient.play.
+
+        :param sock: Bound UDP socket to receive RTP packets on.
+        :param codec: "opus" (passed through) or "pcm" (16-bit 48 kHz stereo little-endian).
+        :param jitter_buffer_ms: Jitter buffer depth in milliseconds (rounded up to whole 20 ms packets).
+        """
+        super().__init__()
+
+        depth: int = max(1, -(-jitter_buffer_ms // FRAME_DURATION_MS))
+        log.debug(f"New NetworkInputSource: {codec=}, jitter buffer depth: {depth} packets.")
+
+        self._socket: socket.socket = sock
+        self._codec: NetworkCodec = codec
+        self._payload_type: int = RTP_PAYLOAD_TYPE_OPUS if codec == "opus" else RTP_PAYLOAD_TYPE_PCM
+        self._jitter_buffer: JitterBuffer = JitterBuffer(depth)
+
+        self._is_closed: bool = False
+        # time.monotonic() deadline of the next frame (None until the first read).
+        self._next_frame_at: Optional[float] = None
+        self._receiver_thread: threading.Thread = threading.Thread(
+            target=self._receive,
+            name="audiophage-network-input",
+            daemon=True,
+        )
+        self._receiver_thread.start()
+
+    @classmethod
+    def create(cls, bind_host: str, port: int, codec: NetworkCodec, jitter_buffer_ms: int) -> "NetworkInputSource":
+        """
+        Bind a UDP socket and instantiate a new NetworkInputSource.
+
+        :param bind_host: Address to listen on.
+        :param port: UDP port to listen on.
+        :param codec: "opus" or "pcm", must match the sender.
+        :param jitter_buffer_ms: Jitter buffer depth in milliseconds.
+        :return: NetworkInputSource instance that can be passed over to VoiceClient.play.
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+            sock.bind((bind_host, port))
+            # Allows the receiver thread to notice the source was closed.
+            sock.settimeout(0.5)
+        except OSError as err:
+            sock.close()
+            raise AudioException(f"Can't listen on {bind_host}:{port}: {err}")
+
+        log.info(f"Listening for {codec} RTP audio on {bind_host}:{port}.")
+        return cls(sock, codec, jitter_buffer_ms)
+
+    def _receive(self):
+        warned_about_payload_type: bool = False
+
+        while not self._is_closed:
+            try:
+                data: bytes = self._socket.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            packet: Optional[RTPPacket] = parse_rtp_packet(data)
+            if packet is None:
+                continue
+
+            if packet.payload_type != self._payload_type:
+                if not warned_about_payload_type:
+                    log.warning(f"Ignoring RTP packets with payload type {packet.payload_type} "
+                                f"(expected {self._payload_type}, is the sender using the same codec?).")
+                    warned_about_payload_type = True
+                continue
+
+            self._jitter_buffer.put(packet)
+
+    def _wait_for_next_frame(self):
+        now: float = time.monotonic()
+        if self._next_frame_at is None or now - self._next_frame_at > FRAME_DURATION_MS / 1000:
+            # The first read or the reader fell behind (e.g. it was stalled): restart the clock
+            # instead of catching up with a burst of frames.
+            self._next_frame_at = now
+        elif self._next_frame_at > now:
+            time.sleep(self._next_frame_at - now)
+
+        self._next_frame_at += FRAME_DURATION_MS / 1000
+
+    def read_into(self, buffer: FrameBuffer) -> bool:
+        """
+        Wait for the next frame's deadline and copy its 20 ms of PCM into the buffer
+        (silence when no packet is available).
+        """
+        self._wait_for_next_frame()
+        payload: Optional[bytes] = self._jitter_buffer.get() if not self._is_closed else None
+        if not payload:
+            buffer.samples.fill(0)
+            return True
+
+        if len(payload) == FRAME_SIZE:
+            buffer.view[:] = payload
+        else:
+            length: int = min(len(payload), FRAME_SIZE)
+            buffer.samples.fill(0)
+            buffer.view[:length] = payload[:length]
+
+        return True
+
+    def read(self) -> Union[FrameBuffer, bytes]:
+        """
+        Wait for the next frame's deadline and read it: an Opus packet (as received) or a pooled PCM FrameBuffer.
+        Returns silence when no packet is available.
+        """
+        if self._codec == "pcm":
+            return super().read()
+
+        if self._profiler is not None:
+            self._on_frame()
+
+        self._wait_for_next_frame()
+        if self._is_closed:
+            return OPUS_SILENCE
+
+        return self._jitter_buffer.get() or OPUS_SILENCE
+
+    def is_opus(self) -> bool:
+        return self._codec == "opus"
+
+    def cleanup(self) -> None:
+        if self._is_closed:
+            return
+        self._is_closed = True
+
+        jitter_buffer = self._jitter_buffer
+        log.info(f"Network input closed: received {jitter_buffer.received} packets, lost {jitter_buffer.lost}, "
+                 f"late {jitter_buffer.late}, {jitter_buffer.underruns} underruns.")
+
+        self._socket.close()
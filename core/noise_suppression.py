@@ -0,0 +1,284 @@
+import logging
+from typing import Optional, Union
+
+import numpy as np
+from discord import AudioSource, ClientException
+
+from .buffers import FrameBuffer, CHANNELS, FRAME_SAMPLES
+
+log = logging.getLogger(__name__)
+
+# Discord.py expects 16-bit 48 kHz stereo PCM in 20 ms frames.
+SAMPLE_RATE: int = 48000
+
+
+class SpectralNoiseSuppressor:
+    """
+    A streaming spectral-subtraction noise suppressor for 16-bit stereo PCM.
+
+    Audio is analysed with 20 ms sqrt-Hann windows at 50 % overlap (10 ms hop) and resynthesized with overlap-add,
+    which adds 10 ms of latency. Each incoming 20 ms frame is processed as two STFT windows in a single vectorized
+    FFT call. The noise profile (mean magnitude spectrum) is learned from the first `learning_seconds` of audio
+    (also while the suppressor is bypassed, see `learn`) and can be relearned at any time with `relearn()`.
+
+    All intermediate arrays are allocated once, so processing a frame with `process_into` doesn't allocate.
+    """
+    __slots__ = (
+        "_window_size", "_hop_size", "_window",
+        "_signal", "_windowed", "_spectrum", "_spectrum_pairs", "_magnitude",
+        "_gain", "_gain_pairs", "_frames", "_output", "_output_carry", "_hop_scratch",
+        "_views",
+        "_noise_profile", "_noise_sum", "_bin_scratch",
+        "_learn_windows_total", "_learn_windows_done", "_relearn_requested",
+        "_over_subtraction", "_gain_floor", "_reduction_db",
+    )
+
+    def __init__(
+            self,
+            reduction_db: float = 12.0,
+            learning_seconds: float = 1.0,
+            over_subtraction: float = 1.5,
+    ):
+        """
+        :param reduction_db: Maximum attenuation (in dB) applied to bins that are considered noise.
+        :param learning_seconds: How much audio to average when learning the noise profile.
+        :param over_subtraction: Factor the noise magnitude is multiplied by before subtraction
+                                 (higher values remove more noise, but are more prone to artifacts).
+        """
+        self._window_size: int = FRAME_SAMPLES
+        self._hop_size: int = FRAME_SAMPLES // 2
+        hop: int = self._hop_size
+        bins: int = self._window_size // 2 + 1
+
+        # A periodic Hann window satisfies the COLA condition at 50 % overlap;
+        # splitting it into sqrt(Hann) for both analysis and synthesis keeps the overall gain at 1.
+        periodic_hann = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(self._window_size) / self._window_size)
+        self._window: np.ndarray = np.sqrt(periodic_hann)
+
+        # Everything is kept channels-first and in float64: numpy's FFT transforms the (contiguous) last axis
+        # of double precision arrays without any temporary buffers (float32 input is copied on every call).
+        # The signal is the previous hop followed by the current frame, both STFT windows are taken from it.
+        self._signal: np.ndarray = np.zeros((CHANNELS, hop + FRAME_SAMPLES), dtype=np.float64)
+
+        self._windowed: np.ndarray = np.zeros((CHANNELS, 2, self._window_size), dtype=np.float64)
+        self._spectrum: np.ndarray = np.zeros((CHANNELS, 2, bins), dtype=np.complex128)
+        self._magnitude: np.ndarray = np.zeros((CHANNELS, 2, bins), dtype=np.float64)
+        self._gain: np.ndarray = np.zeros((CHANNELS, 2, bins), dtype=np.float64)
+        # The spectrum as (real, imaginary) pairs and the gain duplicated for both, so applying the gain
+        # is a plain element-wise multiplication (broadcasting a stride-0 axis makes numpy buffer the operands).
+        self._spectrum_pairs: np.ndarray = self._spectrum.view(np.float64).reshape(CHANNELS, 2, bins, 2)
+        self._gain_pairs: np.ndarray = np.zeros((CHANNELS, 2, bins, 2), dtype=np.float64)
+        self._frames: np.ndarray = np.zeros((CHANNELS, 2, self._window_size), dtype=np.float64)
+        self._output: np.ndarray = np.zeros((CHANNELS, FRAME_SAMPLES), dtype=np.float64)
+        self._output_carry: np.ndarray = np.zeros((CHANNELS, hop), dtype=np.float64)
+        # numpy can't prove that two column ranges of the same 2D array don't overlap and copies through
+        # a temporary buffer, so the hop is shifted through this scratch array instead.
+        self._hop_scratch: np.ndarray = np.zeros((CHANNELS, hop), dtype=np.float64)
+
+        # Slicing creates a new array object each time, so all views used per frame are created here.
+        self._views: tuple[np.ndarray, ...] = (
+            self._signal[:, :hop], self._signal[:, FRAME_SAMPLES:], self._signal[:, hop:],
+            # Windowing is done separately for each window: numpy buffers overlapping strided (sliding window) views.
+            self._signal[:, :self._window_size], self._signal[:, hop:hop + self._window_size],
+            self._windowed[:, 0], self._windowed[:, 1], self._frames[:, 0], self._frames[:, 1],
+            self._frames[:, 0, :hop], self._frames[:, 0, hop:], self._frames[:, 1, :hop], self._frames[:, 1, hop:],
+            self._output[:, :hop], self._output[:, hop:],
+            self._magnitude[:, 0], self._magnitude[:, 1], self._gain[..., np.newaxis],
+        )
+
+        # The learned profile is stored for both windows of a frame to avoid broadcasting while dividing.
+        self._noise_profile: Optional[np.ndarray] = None
+        self._noise_sum: np.ndarray = np.zeros((CHANNELS, bins), dtype=np.float64)
+        self._bin_scratch: np.ndarray = np.zeros((CHANNELS, bins), dtype=np.float64)
+        self._learn_windows_total: int = max(1, int(learning_seconds * SAMPLE_RATE / hop))
+        self._learn_windows_done: int = 0
+        self._relearn_requested: bool = False
+
+        self._over_subtraction: float = over_subtraction
+        self._reduction_db: float = 0.0
+        self._gain_floor: float = 1.0
+        self.reduction_db = reduction_db
+
+    @property
+    def reduction_db(self) -> float:
+        return self._reduction_db
+
+    @reduction_db.setter
+    def reduction_db(self, value: float):
+        self._reduction_db = max(float(value), 0.0)
+        self._gain_floor = float(10 ** (-self._reduction_db / 20))
+
+    @property
+    def is_learning(self) -> bool:
+        return self._noise_profile is None or self._relearn_requested
+
+    def reset(self):
+        """
+        Clear the overlap-add history (e.g. after the suppressor has been bypassed for a while).
+        The learned noise profile is kept. Call from the thread processing the frames.
+        """
+        self._signal.fill(0)
+        self._output_carry.fill(0)
+
+    def relearn(self):
+        """
+        Request the noise profile to be relearned from the upcoming audio.
+        Safe to call from a thread other than the one calling `process`.
+        """
+        self._relearn_requested = True
+
+    def _analyse(self, samples: np.ndarray) -> bool:
+        """
+        Append a frame to the signal and compute the spectrum of both its windows, learning the noise profile
+        if it isn't learned yet.
+
+        :return: Whether the noise profile was available for this frame (False while learning it).
+        """
+        if self._relearn_requested:
+            self._relearn_requested = False
+            self._noise_profile = None
+            self._noise_sum.fill(0)
+            self._learn_windows_done = 0
+
+        signal_previous_hop, signal_last_hop, signal_frame, \
+            first_window_signal, second_window_signal, first_windowed, second_windowed, _, _, \
+            _, _, _, _, \
+            _, _, \
+            first_magnitude, second_magnitude, _ = self._views
+
+        # Shift the last hop of the previous frame to the front and append the new frame.
+        np.copyto(self._hop_scratch, signal_last_hop)
+        np.copyto(signal_previous_hop, self._hop_scratch)
+        np.copyto(signal_frame, samples.T)
+
+        np.multiply(first_window_signal, self._window, out=first_windowed)
+        np.multiply(second_window_signal, self._window, out=second_windowed)
+        np.fft.rfft(self._windowed, out=self._spectrum)
+        np.abs(self._spectrum, out=self._magnitude)
+
+        if self._noise_profile is None:
+            np.add(first_magnitude, second_magnitude, out=self._bin_scratch)
+            self._noise_sum += self._bin_scratch
+            self._learn_windows_done += 2
+
+            if self._learn_windows_done >= self._learn_windows_total:
+                self._noise_profile = np.repeat(
+                    (self._noise_sum / self._learn_windows_done)[:, np.newaxis], 2, axis=1
+                )
+                log.info(f"Noise profile learned from {self._learn_windows_done} windows.")
+            return False
+
+        return True
+
+    def learn(self, samples: np.ndarray):
+        """
+        Learn the noise profile from a frame of 16-bit stereo PCM without processing it
+        (called for the frames that bypass the suppressor). Does nothing once the profile is learned.
+        """
+        if self.is_learning:
+            self._analyse(samples)
+
+    def process_into(self, samples: np.ndarray):
+        """
+        Process a single 20 ms frame of 16-bit stereo PCM (a (960, 2) int16 array) in place,
+        replacing it with the same amount of (delayed) processed audio.
+        """
+        _, _, _, \
+            _, _, _, _, first_frame, second_frame, \
+            first_window_start, first_window_end, second_window_start, second_window_end, \
+            output_start, output_end, \
+            _, _, gain_column = self._views
+
+        if self._analyse(samples):
+            # gain = 1 - over_subtraction * noise / magnitude, limited to [gain_floor, 1]
+            gain = self._gain
+            np.maximum(self._magnitude, 1e-6, out=gain)
+            np.divide(self._noise_profile, gain, out=gain)
+            gain *= -self._over_subtraction
+            gain += 1.0
+            np.maximum(gain, self._gain_floor, out=gain)
+            np.minimum(gain, 1.0, out=gain)
+
+            np.copyto(self._gain_pairs, gain_column)
+            self._spectrum_pairs *= self._gain_pairs
+
+        np.fft.irfft(self._spectrum, n=self._window_size, out=self._frames)
+        first_frame *= self._window
+        second_frame *= self._window
+
+        # Overlap-add: the first window completes the previous frame's second half, the second window is carried over.
+        output = self._output
+        np.add(self._output_carry, first_window_start, out=output_start)
+        np.add(first_window_end, second_window_start, out=output_end)
+        np.copyto(self._output_carry, second_window_end)
+
+        np.maximum(output, -32768.0, out=output)
+        np.minimum(output, 32767.0, out=output)
+        np.copyto(samples.T, output, casting="unsafe")
+
+    def process(self, pcm: bytes) -> bytes:
+        """
+        Process a single 20 ms frame of 16-bit stereo PCM and return the same amount of (delayed) processed audio.
+        """
+        samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, CHANNELS).copy()
+        self.process_into(samples)
+        return samples.tobytes()
+
+
+class NoiseSuppressionTransformer(AudioSource):
+    """
+    A discord AudioSource that wraps another (PCM) AudioSource and runs it through a SpectralNoiseSuppressor.
+    Works similarly to discord's PCMVolumeTransformer and can be enabled or disabled while streaming
+    (the noise profile is learned either way).
+    Pooled FrameBuffers from the original source are processed in place.
+    """
+
+    def __init__(self, original: AudioSource, suppressor: SpectralNoiseSuppressor, enabled: bool = True):
+        if original.is_opus():
+            raise ClientException("AudioSource must not be Opus encoded.")
+
+        self.original: AudioSource = original
+        self.suppressor: SpectralNoiseSuppressor = suppressor
+        self._enabled: bool = enabled
+        self._enabled_requested: bool = enabled
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled_requested
+
+    @enabled.setter
+    def enabled(self, value: bool):
+        # Toggled from the event loop while the capture thread may be processing a frame,
+        # so the change is only applied by read, between frames.
+        self._enabled_requested = value
+
+    def read(self) -> Union[FrameBuffer, bytes]:
+        data = self.original.read()
+        if not data:
+            return data
+
+        if self._enabled != self._enabled_requested:
+            if self._enabled_requested:
+                # Don't overlap-add audio from before the suppressor was bypassed.
+                self.suppressor.reset()
+            self._enabled = self._enabled_requested
+
+        if not self._enabled:
+            # Keep learning the noise profile, so it's ready (and learned from the start of the stream) once enabled.
+            if self.suppressor.is_learning:
+                samples = data.samples if isinstance(data, FrameBuffer) \
+                    else np.frombuffer(data, dtype=np.int16).reshape(-1, CHANNELS)
+                self.suppressor.learn(samples)
+            return data
+
+        if isinstance(data, FrameBuffer):
+            self.suppressor.process_into(data.samples)
+            return data
+
+        return self.suppressor.process(data)
+
+    def is_opus(self) -> bool:
+        return False
+
+    def cleanup(self) -> None:
+        self.original.cleanup()
@@ -0,0 +1,196 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+# Names of a stream's threads (see core.capture): reading and processing the input, encoding and sending it.
+PROFILED_THREAD_CAPTURE: str = "capture"
+PROFILED_THREAD_PLAYER: str = "player"
+
+
+def _format_location(filename: str, line: int, function: str) -> str:
+    return f"{function} ({os.path.basename(filename)}:{line})"
+
+
+class SamplingProfiler:
+    """
+    A statistical profiler that periodically samples the Python stacks of a few threads (e.g. a stream's capture
+    and player threads). Costs nothing while not running and has no effect on threads other than the sampled ones
+    (apart from briefly taking the GIL on each sample).
+    """
+    __slots__ = ("_threads", "_interval", "_self_counts", "_cumulative_counts", "_samples", "_duration")
+
+    def __init__(self, threads: dict[str, int], interval: float = 0.001):
+        """
+        :param threads: Threads to sample: a name (used in the report) and identifier (see threading.Thread.ident)
+                        for each one.
+        :param interval: Time between samples, in seconds.
+        """
+        self._threads: dict[str, int] = threads
+        self._interval: float = interval
+
+        # Counts for each sampled thread (keyed by name).
+        self._self_counts: dict[str, Counter] = {name: Counter() for name in threads}
+        self._cumulative_counts: dict[str, Counter] = {name: Counter() for name in threads}
+        self._samples: dict[str, int] = {name: 0 for name in threads}
+        self._duration: float = 0
+
+    def run(self, seconds: float):
+        """
+        Sample the threads for the given amount of seconds. Blocks, so run it in a separate thread.
+        """
+        started_at = time.perf_counter()
+        deadline = started_at + seconds
+        running: dict[str, int] = dict(self._threads)
+
+        while running and time.perf_counter() < deadline:
+            # noinspection PyProtectedMember
+            frames = sys._current_frames()
+
+            for name, thread_ident in list(running.items()):
+                frame = frames.get(thread_ident)
+                if frame is None:
+                    log.warning(f"Sampled thread {name} is no longer running, not sampling it anymore.")
+                    del running[name]
+                    continue
+
+                self._samples[name] += 1
+                # The innermost frame is the one actually executing (or waiting inside a C call it made).
+                self._self_counts[name][
+                    _format_location(frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name)
+                ] += 1
+
+                seen_functions: set[str] = set()
+                while frame is not None:
+                    code = frame.f_code
+                    function = _format_location(code.co_filename, code.co_firstlineno, code.co_name)
+                    if function not in seen_functions:
+                        seen_functions.add(function)
+                        self._cumulative_counts[name][function] += 1
+                    frame = frame.f_back
+
+            del frames
+            time.sleep(self._interval)
+
+        self._duration = time.perf_counter() - started_at
+
+    def report(self, top: int = 25) -> str:
+        """
+        Summarize the collected samples into a plain-text report of the top lines and functions of each thread.
+        """
+        output = io.StringIO()
+        output.write(f"Sampling profile over {self._duration:.2f} s (interval: {self._interval * 1000:.1f} ms).\n")
+
+        for name in self._threads:
+            samples: int = self._samples[name]
+            output.write(f"\n=== Thread: {name} ({samples} samples) ===\n")
+            if samples == 0:
+                continue
+
+            output.write(f"\nTop {top} lines (self time - where the thread was executing or waiting):\n")
+            for location, count in self._self_counts[name].most_common(top):
+                output.write(f"  {count / samples:7.2%}  {count:7d}  {location}\n")
+
+            output.write(f"\nTop {top} functions (cumulative time - including callees):\n")
+            for location, count in self._cumulative_counts[name].most_common(top):
+                output.write(f"  {count / samples:7.2%}  {count:7d}  {location}\n")
+
+        return output.getvalue()
+
+
+class DeterministicProfiler:
+    """
+    A cProfile-based profiler that is enabled from inside the threads to profile (cProfile only sees the thread
+    it was enabled in, so each thread gets its own profile). Attach it to a stream's input source
+    (see InputSource.attach_profiler), which is read by the capture thread (reading and processing), and to
+    the stream's CapturedSource, which is read by the player thread (Opus encoding, sending, ...).
+    Each thread is profiled for the requested amount of seconds from the first frame any of them reads.
+    """
+    __slots__ = ("_seconds", "_threads", "_profiles", "_frames", "_deadline", "_started_at", "_duration",
+                 "_lock", "_finished")
+
+    def __init__(self, seconds: float, threads: tuple[str, ...]):
+        """
+        :param seconds: How long to profile for.
+        :param threads: Names of the threads that will call on_frame (used in the report).
+        """
+        self._seconds: float = seconds
+        self._threads: tuple[str, ...] = threads
+        self._profiles: dict[str, cProfile.Profile] = {name: cProfile.Profile() for name in threads}
+        self._frames: dict[str, int] = {name: 0 for name in threads}
+
+        self._deadline: Optional[float] = None
+        self._started_at: float = 0
+        self._duration: float = 0
+        self._lock: threading.Lock = threading.Lock()
+        # Set for each thread once it has finished.
+        self._finished: dict[str, threading.Event] = {name: threading.Event() for name in threads}
+
+    def on_frame(self, thread: str) -> bool:
+        """
+        Called by a profiled thread on each audio frame.
+
+        :param thread: Name of the calling thread (one of the names passed to the constructor).
+        :return: True while the profiler should stay attached, False once it has finished (for this thread).
+        """
+        now = time.perf_counter()
+        with self._lock:
+            if self._deadline is None:
+                self._started_at = now
+                self._deadline = now + self._seconds
+
+        if now >= self._deadline:
+            self._profiles[thread].disable()
+            self._duration = max(self._duration, now - self._started_at)
+            self._finished[thread].set()
+            return False
+
+        if self._frames[thread] == 0:
+            self._profiles[thread].enable()
+        self._frames[thread] += 1
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until profiling has finished in every thread. Run it in a separate thread.
+
+        :return: Whether profiling finished before the timeout.
+        """
+        deadline = time.perf_counter() + timeout if timeout is not None else None
+        for finished in self._finished.values():
+            remaining = max(deadline - time.perf_counter(), 0) if deadline is not None else None
+            if not finished.wait(remaining):
+                return False
+
+        return True
+
+    def report(self, top: int = 25) -> str:
+        """
+        Summarize the collected profiles into a plain-text report of the top functions of each thread.
+        """
+        output = io.StringIO()
+        output.write(f"Deterministic profile over {self._duration:.2f} s.\n")
+
+        for name in self._threads:
+            output.write(f"\n=== Thread: {name} ({self._frames[name]} audio frames) ===\n")
+            if not self._finished[name].is_set():
+                output.write("Profiling did not finish (the audio stream stopped or no frames were read).\n")
+                continue
+
+            stats = pstats.Stats(self._profiles[name], stream=output)
+            stats.strip_dirs()
+
+            output.write(f"\nTop {top} functions by own time:\n")
+            stats.sort_stats(pstats.SortKey.TIME).print_stats(top)
+            output.write(f"\nTop {top} functions by cumulative time:\n")
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+
+        return output.getvalue()
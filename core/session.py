@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+SESSION_FILE_VERSION: int = 1
+
+
+@dataclass(eq=True, frozen=True)
+class SessionCheckpoint:
+    """
+    Everything needed to resume a guild's stream after a restart.
+    """
+    guild_id: int
+    voice_channel_id: int
+    profile_name: str
+    # Informational only, the input is reopened through its profile.
+    input_device_name: Optional[str]
+    # None for inputs that aren't processed (Opus).
+    volume: Optional[float]
+    noise_suppression_enabled: Optional[bool]
+    noise_reduction_db: Optional[float]
+
+
+class SessionStore:
+    """
+    Persists the active streams (as SessionCheckpoints) to a JSON file, so they can be restored on startup.
+
+    `update` is cheap and meant to be called from the event loop on every change, `flush` does the (blocking)
+    write and is meant to be run in a worker thread. Writes are atomic (a temporary file is renamed over the old one),
+    so a crash mid-write never leaves a corrupt session behind, and flushes racing each other always leave
+    the latest state on disk.
+    """
+    __slots__ = ("_path", "_checkpoints", "_generation", "_flushed_generation", "_lock", "_write_lock")
+
+    def __init__(self, path: Path):
+        """
+        :param path: Session file path.
+        """
+        self._path: Path = path
+        self._checkpoints: list[SessionCheckpoint] = []
+        self._generation: int = 0
+        self._flushed_generation: int = 0
+        # _lock only guards the checkpoints (so `update` never waits for the disk), _write_lock serializes writes.
+        self._lock: threading.Lock = threading.Lock()
+        self._write_lock: threading.Lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def load(self) -> list[SessionCheckpoint]:
+        """
+        Read the checkpoints saved by the previous run (an empty list if there are none or the file is unreadable).
+        """
+        try:
+            with self._path.open(mode="r", encoding="utf-8") as session_file:
+                data = json.load(session_file)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as err:
+            log.warning(f"Can't read the session file {self._path}, not restoring anything: {err}")
+            return []
+
+        if not isinstance(data, dict) or data.get("version") != SESSION_FILE_VERSION:
+            log.warning(f"Unsupported session file {self._path}, not restoring anything.")
+            return []
+
+        checkpoints: list[SessionCheckpoint] = []
+        for entry in data.get("sessions", []):
+            try:
+                checkpoints.append(SessionCheckpoint(**entry))
+            except TypeError:
+                log.warning(f"Skipping invalid session entry: {entry}")
+
+        return checkpoints
+
+    def update(self, checkpoints: list[SessionCheckpoint]):
+        """
+        Replace the checkpoints to be written by the next `flush`.
+        """
+        with self._lock:
+            self._checkpoints = list(checkpoints)
+            self._generation += 1
+
+    def flush(self):
+        """
+        Atomically write the latest checkpoints to the session file (if they changed since the last flush).
+        """
+        with self._write_lock:
+            with self._lock:
+                generation: int = self._generation
+                if self._flushed_generation == generation:
+                    return
+
+                data = {
+                    "version": SESSION_FILE_VERSION,
+                    "sessions": [asdict(checkpoint) for checkpoint in self._checkpoints],
+                }
+
+            temporary_path: Optional[str] = None
+            try:
+                self._path.parent.mkdir(parents=True, exist_ok=True)
+                file_descriptor, temporary_path = tempfile.mkstemp(
+                    prefix=f".{self._path.name}.", suffix=".tmp", dir=self._path.parent
+                )
+                with os.fdopen(file_descriptor, mode="w", encoding="utf-8") as temporary_file:
+                    json.dump(data, temporary_file, indent=2)
+                    temporary_file.flush()
+                    os.fsync(temporary_file.fileno())
+
+                os.replace(temporary_path, self._path)
+                temporary_path = None
+                self._flushed_generation = generation
+                log.debug(f"Session saved: {len(data['sessions'])} active streams.")
+
+            except OSError as err:
+                log.error(f"Couldn't save the session to {self._path}: {err}")
+
+            finally:
+                if temporary_path is not None:
+                    try:
+                        os.remove(temporary_path)
+                    except OSError:
+                        pass
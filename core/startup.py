@@ -0,0 +1,144 @@
+import builtins
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional, Iterator
+
+log = logging.getLogger(__name__)
+
+STARTUP_PROFILE_FLAG: str = "--startup-profile"
+
+
+@dataclass(eq=True, frozen=True)
+class ImportTiming:
+    name: str
+    # Time spent importing this module itself and including the modules it imported, in seconds.
+    self_time: float
+    cumulative_time: float
+    # 0 for modules imported directly by the profiled script.
+    depth: int
+
+
+class StartupProfiler:
+    """
+    Breaks down the time from starting the bot to it being ready: how long importing each module took
+    (like `python -X importtime`, which isn't available in the packaged build) and how long each
+    initialization step took.
+
+    Disabled unless the flag is passed on the command line, in which case it has to be created before anything
+    else is imported. While disabled, `step` and `mark` do nothing.
+    """
+    __slots__ = (
+        "enabled", "_started_at", "_original_import", "_thread_ident", "_child_times",
+        "_imports", "_steps",
+    )
+
+    def __init__(self, enabled: bool):
+        self.enabled: bool = enabled
+        self._started_at: float = time.perf_counter()
+        self._original_import = builtins.__import__
+        self._thread_ident: int = threading.get_ident()
+        # Time spent in nested imports, for each import in progress.
+        self._child_times: list[float] = []
+
+        self._imports: list[ImportTiming] = []
+        # Name, start (relative to the start of profiling) and duration of each step, in seconds.
+        self._steps: list[tuple[str, float, float]] = []
+
+        if enabled:
+            builtins.__import__ = self._timed_import
+
+    @classmethod
+    def from_arguments(cls, arguments: list[str]) -> "StartupProfiler":
+        return cls(STARTUP_PROFILE_FLAG in arguments)
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # Only the main thread is profiled, imports in worker threads would mix up the nesting.
+        if threading.get_ident() != self._thread_ident:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        modules_before: int = len(sys.modules)
+        depth: int = len(self._child_times)
+        self._child_times.append(0.0)
+        started_at: float = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed: float = time.perf_counter() - started_at
+            child_time: float = self._child_times.pop()
+            if self._child_times:
+                self._child_times[-1] += elapsed
+
+            # Nothing new was imported if sys.modules didn't grow (the module was already imported).
+            if len(sys.modules) != modules_before:
+                if level > 0 and globals is not None:
+                    # Relative import, e.g. "from . import x" (name is empty) or "from .x import y".
+                    package: str = globals.get("__package__") or ""
+                    name = f"{package}.{name}" if name else f"{package}.{{{', '.join(fromlist or ())}}}"
+                self._imports.append(ImportTiming(name, elapsed - child_time, elapsed, depth))
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        """
+        Time an initialization step (a context manager).
+        """
+        if not self.enabled:
+            yield
+            return
+
+        started_at: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._steps.append((name, started_at - self._started_at, time.perf_counter() - started_at))
+
+    def mark(self, name: str):
+        """
+        Record the time something happened (e.g. an event arriving).
+        """
+        if self.enabled:
+            self._steps.append((name, time.perf_counter() - self._started_at, 0.0))
+
+    def format_report(self, top: int = 25) -> str:
+        total_time: float = time.perf_counter() - self._started_at
+        import_time: float = sum(timing.cumulative_time for timing in self._imports if timing.depth == 0)
+
+        lines: list[str] = [
+            f"Startup profile: ready {total_time * 1000:.0f} ms after starting, "
+            f"{import_time * 1000:.0f} ms of it importing {len(self._imports)} modules.",
+            "Steps (start, duration):",
+        ]
+        for name, started_at, duration in self._steps:
+            duration_text: str = f"{duration * 1000:8.1f} ms" if duration > 0 else " " * 11
+            lines.append(f"  {started_at * 1000:8.1f} ms {duration_text}  {name}")
+
+        lines.append("Imports made by the bot itself (cumulative):")
+        for timing in sorted(self._imports, key=lambda timing: timing.cumulative_time, reverse=True):
+            if timing.depth == 0 and timing.cumulative_time >= 0.001:
+                lines.append(f"  {timing.cumulative_time * 1000:8.1f} ms  {timing.name}")
+
+        lines.append(f"Slowest {top} modules (self / cumulative):")
+        for timing in sorted(self._imports, key=lambda timing: timing.self_time, reverse=True)[:top]:
+            lines.append(f"  {timing.self_time * 1000:8.1f} ms {timing.cumulative_time * 1000:8.1f} ms  "
+                         f"{'  ' * timing.depth}{timing.name}")
+
+        return "\n".join(lines)
+
+    def finish(self) -> Optional[str]:
+        """
+        Stop profiling imports and log the report.
+
+        :return: The report (None if disabled or already finished).
+        """
+        if not self.enabled:
+            return None
+
+        self.enabled = False
+        builtins.__import__ = self._original_import
+
+        report: str = self.format_report()
+        log.info(report)
+        return report
@@ -1,25 +1,58 @@
 from typing import Optional
 
-from discord import VoiceClient
+from discord import VoiceClient, AudioSource
+
+from .capture import CapturedSource
+from .input_source import InputSource
+
+
+class GuildStream:
+    """
+    State of a single guild's active stream.
+    """
+    __slots__ = ("voice_client", "profile_name", "captured")
+
+    def __init__(self, voice_client: VoiceClient, profile_name: str, captured: CapturedSource):
+        self.voice_client: VoiceClient = voice_client
+        self.profile_name: str = profile_name
+        self.captured: CapturedSource = captured
+
+    @property
+    def input_source(self) -> InputSource:
+        return self.captured.input_source
+
+    @property
+    def pipeline(self) -> AudioSource:
+        """
+        The end of the processing pipeline (a PCMVolumeTransformer, or the input source itself for Opus input).
+        """
+        return self.captured.pipeline
+
 
 class AudiophageState:
     """
-    A simple key-value store in the form of a class.
+    A simple key-value store in the form of a class: the active stream of each guild.
     """
-    __slots__ = ("_is_streaming", "_voice_client")
+    __slots__ = ("_streams", )
 
     def __init__(self):
-        self._is_streaming: bool = False
-        self._voice_client: Optional[VoiceClient] = None
+        self._streams: dict[int, GuildStream] = {}
+
+    def set_stream_started(self, client: VoiceClient, profile_name: str, captured: CapturedSource):
+        self._streams[client.guild.id] = GuildStream(client, profile_name, captured)
+
+    def set_stream_ended(self, guild_id: int):
+        self._streams.pop(guild_id, None)
 
-    def set_stream_started(self, client: VoiceClient):
-        self._is_streaming = True
-        self._voice_client = client
+    def get(self, guild_id: Optional[int]) -> Optional[GuildStream]:
+        return self._streams.get(guild_id) if guild_id is not None else None
 
-    def set_stream_ended(self):
-        self._is_streaming = False
-        self._voice_client = None
+    def find_by_profile(self, profile_name: str) -> Optional[GuildStream]:
+        for guild_stream in self._streams.values():
+            if guild_stream.profile_name == profile_name:
+                return guild_stream
+        return None
 
     @property
-    def stream(self) -> Optional[VoiceClient]:
-        return self._voice_client if self._is_streaming else None
+    def streams(self) -> list[GuildStream]:
+        return list(self._streams.values())
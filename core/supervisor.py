@@ -0,0 +1,304 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from dataclasses import dataclass
+from functools import partial
+from multiprocessing.context import SpawnProcess
+from pathlib import Path
+from typing import Union, Optional
+
+from .configuration_base import TOMLConfig, BASE_DIR, CONFIGURATION_PATH_ENV
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(eq=True, frozen=True)
+class InstanceConfiguration:
+    name: str
+    configuration_path: Path
+    cpu_core: Optional[int]
+
+
+@dataclass(eq=True, frozen=True)
+class InstanceHealth:
+    name: str
+    pid: int
+    is_ready: bool
+    is_streaming: bool
+    latency: float
+
+
+class SupervisorConfiguration:
+    def __init__(self, configuration: TOMLConfig):
+        self._config: TOMLConfig = configuration
+
+        ### Tables
+        self._supervisor: TOMLConfig = self._config.get_table("supervisor") or TOMLConfig({})
+        self._instances: list = self._config.get("instances", raise_on_missing_key=True)
+
+        ## "supervisor" table
+        self.RESTART_BACKOFF_SECONDS: float = max(
+            float(self._supervisor.get("restart_backoff_seconds", fallback=2.0)), 0.1
+        )
+        self.MAX_RESTART_BACKOFF_SECONDS: float = max(
+            float(self._supervisor.get("max_restart_backoff_seconds", fallback=60.0)), self.RESTART_BACKOFF_SECONDS
+        )
+        self.STABLE_AFTER_SECONDS: float = float(self._supervisor.get("stable_after_seconds", fallback=120.0))
+        self.HEARTBEAT_INTERVAL_SECONDS: float = max(
+            float(self._supervisor.get("heartbeat_interval_seconds", fallback=5.0)), 1.0
+        )
+        self.HEARTBEAT_TIMEOUT_SECONDS: float = float(self._supervisor.get("heartbeat_timeout_seconds", fallback=60.0))
+        self.HEALTH_REPORT_INTERVAL_SECONDS: float = max(
+            float(self._supervisor.get("health_report_interval_seconds", fallback=60.0)), 1.0
+        )
+
+        ## "instances" array of tables
+        self.INSTANCES: list[InstanceConfiguration] = []
+        for instance_data in self._instances:
+            instance = TOMLConfig(instance_data)
+
+            configuration_path = Path(instance.get("configuration", raise_on_missing_key=True))
+            if not configuration_path.is_absolute():
+                configuration_path = BASE_DIR / configuration_path
+
+            cpu_core: Optional[int] = instance.get("cpu_core", fallback=None)
+
+            self.INSTANCES.append(InstanceConfiguration(
+                name=str(instance.get("name", raise_on_missing_key=True)),
+                configuration_path=configuration_path.resolve(),
+                cpu_core=int(cpu_core) if cpu_core is not None else None,
+            ))
+
+        instance_names = [i.name for i in self.INSTANCES]
+        if len(set(instance_names)) != len(instance_names):
+            raise ValueError("Instance names in the supervisor configuration must be unique.")
+
+    @classmethod
+    def from_file_path(cls, configuration_filepath: Union[str, Path]) -> "SupervisorConfiguration":
+        """
+        Initialize a new instance by reading from the specified configuration file.
+
+        :param configuration_filepath: File path of the supervisor config file to read from.
+        :return: SupervisorConfiguration instance with the parsed values.
+        """
+        return cls(TOMLConfig.from_filename(str(configuration_filepath)))
+
+
+def _pin_to_cpu_core(cpu_core: int):
+    """
+    Pin the current process to a single CPU core (Windows, Linux and FreeBSD).
+    """
+    import psutil
+
+    try:
+        psutil.Process().cpu_affinity([cpu_core])
+    except AttributeError:
+        log.warning("CPU affinity is not supported on this platform, not pinning.")
+    except ValueError:
+        log.warning(f"Invalid CPU core {cpu_core} (this machine has {psutil.cpu_count()} logical cores), not pinning.")
+
+
+async def _send_heartbeats(instance_name: str, health_queue: multiprocessing.Queue, interval: float):
+    """
+    Periodically report the health of the bot running in this (worker) process to the supervisor.
+    Runs as a task on the bot's event loop, so a hung or blocked event loop stops the heartbeats.
+    """
+    import stream
+
+    while True:
+        try:
+            health_queue.put_nowait(InstanceHealth(
+                name=instance_name,
+                pid=os.getpid(),
+                is_ready=stream.client.is_ready(),
+                is_streaming=len(stream.state.streams) > 0,
+                latency=stream.client.latency,
+            ))
+        except queue.Full:
+            pass
+
+        await asyncio.sleep(interval)
+
+
+def run_worker(instance: InstanceConfiguration, health_queue: multiprocessing.Queue, heartbeat_interval: float):
+    """
+    Entry point of a worker process: runs a single bot instance (the same as stream.py) with its own configuration.
+    """
+    logging.basicConfig(level=logging.INFO, format=f"[{instance.name}] %(levelname)s:%(name)s:%(message)s")
+
+    # Must be set before stream.py (and with it core.configuration) is imported.
+    os.environ[CONFIGURATION_PATH_ENV] = str(instance.configuration_path)
+
+    if instance.cpu_core is not None:
+        _pin_to_cpu_core(instance.cpu_core)
+
+    import stream
+
+    # Started by stream.py once logged in.
+    stream.send_heartbeats = partial(_send_heartbeats, instance.name, health_queue, heartbeat_interval)
+
+    # The worker inherits the supervisor's command line arguments, which aren't meant for the bot.
+    stream.main([])
+
+
+class Worker:
+    """
+    Supervisor-side bookkeeping for a single bot instance (worker process).
+    """
+    __slots__ = (
+        "instance", "process", "started_at", "restarts", "consecutive_failures", "restart_at",
+        "health", "last_heartbeat",
+    )
+
+    def __init__(self, instance: InstanceConfiguration):
+        self.instance: InstanceConfiguration = instance
+        self.process: Optional[SpawnProcess] = None
+        self.started_at: float = 0
+        self.restarts: int = 0
+        self.consecutive_failures: int = 0
+        self.restart_at: Optional[float] = None
+        self.health: Optional[InstanceHealth] = None
+        self.last_heartbeat: float = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+class Supervisor:
+    """
+    Launches each configured bot instance in its own worker process (optionally pinned to a CPU core),
+    restarts crashed or unresponsive workers with exponential backoff and aggregates their health.
+    """
+
+    def __init__(self, configuration: SupervisorConfiguration):
+        self._config: SupervisorConfiguration = configuration
+        self._context = multiprocessing.get_context("spawn")
+        self._health_queue: multiprocessing.Queue = self._context.Queue()
+        self._workers: dict[str, Worker] = {
+            instance.name: Worker(instance) for instance in configuration.INSTANCES
+        }
+
+    def _start_worker(self, worker: Worker):
+        worker.process = self._context.Process(
+            target=run_worker,
+            args=(worker.instance, self._health_queue, self._config.HEARTBEAT_INTERVAL_SECONDS),
+            name=f"audiophage-{worker.instance.name}",
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        worker.restart_at = None
+        worker.health = None
+        worker.last_heartbeat = worker.started_at
+
+        log.info(f"Started instance {worker.instance.name} (pid {worker.process.pid}, "
+                 f"core: {worker.instance.cpu_core}, configuration: {worker.instance.configuration_path}).")
+
+    def _schedule_restart(self, worker: Worker, reason: str):
+        uptime = time.monotonic() - worker.started_at
+        if uptime >= self._config.STABLE_AFTER_SECONDS:
+            worker.consecutive_failures = 0
+        worker.consecutive_failures += 1
+
+        backoff = min(
+            self._config.RESTART_BACKOFF_SECONDS * 2 ** (worker.consecutive_failures - 1),
+            self._config.MAX_RESTART_BACKOFF_SECONDS,
+        )
+        worker.restart_at = time.monotonic() + backoff
+
+        log.warning(f"Instance {worker.instance.name} {reason} after {uptime:.0f} s, restarting in {backoff:.1f} s.")
+
+    def _collect_health(self):
+        while True:
+            try:
+                health: InstanceHealth = self._health_queue.get_nowait()
+            except queue.Empty:
+                return
+
+            worker = self._workers.get(health.name)
+            if worker is not None and worker.process is not None and worker.process.pid == health.pid:
+                worker.health = health
+                worker.last_heartbeat = time.monotonic()
+
+    def _check_workers(self):
+        now = time.monotonic()
+
+        for worker in self._workers.values():
+            if worker.restart_at is not None:
+                if now >= worker.restart_at:
+                    worker.restarts += 1
+                    self._start_worker(worker)
+                continue
+
+            if not worker.is_running:
+                self._schedule_restart(worker, f"exited with code {worker.process.exitcode}")
+                continue
+
+            timeout = self._config.HEARTBEAT_TIMEOUT_SECONDS
+            if timeout > 0 and now - worker.last_heartbeat > timeout:
+                worker.process.kill()
+                worker.process.join()
+                self._schedule_restart(worker, f"sent no heartbeat for {timeout:.0f} s")
+
+    def health_report(self) -> str:
+        """
+        Aggregate the health of all instances into a human-readable summary.
+        """
+        lines: list[str] = []
+        ready_count: int = 0
+        streaming_count: int = 0
+
+        for worker in self._workers.values():
+            health = worker.health
+            if not worker.is_running:
+                status = "restarting"
+            elif health is None:
+                status = "starting"
+            else:
+                status = "ready" if health.is_ready else "connecting"
+                ready_count += health.is_ready
+                streaming_count += health.is_streaming
+
+            line = f"  {worker.instance.name}: {status}, restarts: {worker.restarts}"
+            if worker.is_running:
+                line += f", pid: {worker.process.pid}, uptime: {time.monotonic() - worker.started_at:.0f} s"
+            if health is not None:
+                line += f", streaming: {health.is_streaming}, latency: {health.latency * 1000:.0f} ms, " \
+                        f"last heartbeat: {time.monotonic() - worker.last_heartbeat:.0f} s ago"
+            lines.append(line)
+
+        header = f"Health: {ready_count}/{len(self._workers)} instances ready, {streaming_count} streaming."
+        return "\n".join([header, *lines])
+
+    def run(self):
+        """
+        Start all instances and supervise them until interrupted.
+        """
+        log.info(f"Starting {len(self._workers)} instances.")
+        for worker in self._workers.values():
+            self._start_worker(worker)
+
+        next_report = time.monotonic() + self._config.HEALTH_REPORT_INTERVAL_SECONDS
+        try:
+            while True:
+                time.sleep(1)
+                self._collect_health()
+                self._check_workers()
+
+                if time.monotonic() >= next_report:
+                    log.info(self.health_report())
+                    next_report = time.monotonic() + self._config.HEALTH_REPORT_INTERVAL_SECONDS
+
+        except KeyboardInterrupt:
+            log.info("Stopping all instances ...")
+
+        finally:
+            for worker in self._workers.values():
+                if worker.is_running:
+                    worker.process.terminate()
+            for worker in self._workers.values():
+                if worker.process is not None:
+                    worker.process.join(timeout=10)
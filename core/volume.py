@@ -0,0 +1,37 @@
+import audioop
+from typing import Union
+
+import numpy as np
+from discord import AudioSource, PCMVolumeTransformer
+
+from .buffers import FrameBuffer, CHANNELS, FRAME_SAMPLES
+
+
+class PooledVolumeTransformer(PCMVolumeTransformer):
+    """
+    A PCMVolumeTransformer that changes the volume of pooled FrameBuffers in place
+    (discord's implementation allocates a new bytes object for every frame).
+    Anything else is handled the same way as in PCMVolumeTransformer.
+    """
+
+    def __init__(self, original: AudioSource, volume: float = 1.0):
+        super().__init__(original, volume)
+        self._scratch: np.ndarray = np.zeros((FRAME_SAMPLES, CHANNELS), dtype=np.float32)
+
+    def read(self) -> Union[FrameBuffer, bytes]:
+        data = self.original.read()
+        volume: float = min(self._volume, 2.0)
+
+        if not isinstance(data, FrameBuffer):
+            return audioop.mul(data, 2, volume)
+
+        if volume != 1.0:
+            scratch = self._scratch
+            # Every step is a separate in-place ufunc: a mixed-type multiplication or np.clip would allocate.
+            np.copyto(scratch, data.samples)
+            scratch *= volume
+            np.maximum(scratch, -32768.0, out=scratch)
+            np.minimum(scratch, 32767.0, out=scratch)
+            np.copyto(data.samples, scratch, casting="unsafe")
+
+        return data
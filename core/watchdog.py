@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Literal, Optional
+
+from .state import GuildStream
+
+log = logging.getLogger(__name__)
+
+StallKind = Literal["capture", "player"]
+# A recovery step: performs the recovery on a stalled stream (the watchdog then checks whether it worked).
+RecoveryAction = Callable[[GuildStream], Awaitable[None]]
+
+RECOVERY_STEP_REREAD: str = "re-read"
+RECOVERY_STEP_REOPEN_INPUT: str = "reopen input"
+RECOVERY_STEP_REBUILD_PLAYER: str = "rebuild player"
+
+
+@dataclass(eq=True, frozen=True)
+class RecoveryAttempt:
+    step: str
+    # Time from starting the step to the stream being healthy again (or to giving up on the step), in seconds.
+    duration: float
+    succeeded: bool
+    error: Optional[str]
+
+
+@dataclass(eq=True, frozen=True)
+class StallIncident:
+    stream_name: str
+    guild_id: int
+    # "capture" if the input stopped delivering frames, "player" if the player stopped reading them.
+    kind: StallKind
+    # How long nothing was delivered before the stall was detected, in seconds.
+    stalled_for: float
+    attempts: tuple[RecoveryAttempt, ...]
+    recovered: bool
+    # Time from the last frame to the stream being healthy again (or to giving up), in seconds.
+    outage: float
+
+    def format(self) -> str:
+        steps: str = ", ".join(
+            f"{attempt.step} ({'ok' if attempt.succeeded else 'failed'} after {attempt.duration:.2f} s"
+            f"{': ' + attempt.error if attempt.error is not None else ''})"
+            for attempt in self.attempts
+        )
+        outcome: str = "recovered" if self.recovered else "NOT recovered"
+        return f"{self.kind.capitalize()} of stream {self.stream_name} stalled " \
+               f"(detected after {self.stalled_for:.2f} s), {outcome} after an outage of {self.outage:.2f} s. " \
+               f"Steps: {steps or 'none'}."
+
+
+class PipelineWatchdog:
+    """
+    Watches the active streams for stalls: the input not delivering frames to the capture thread
+    (e.g. a read hanging inside PortAudio) or the player not reading them (e.g. the player thread crashed),
+    for longer than `stall_threshold` seconds.
+
+    A stalled stream is recovered by escalating through the recovery steps, in order, until the stream is healthy
+    again: each step gets `step_timeout` seconds to run and then `stall_threshold` seconds for frames to flow again.
+    Capture stalls go through all steps, player stalls (the input is fine) only through the rebuild player step.
+    Every incident (with its timing) is passed to `report`.
+    """
+    __slots__ = (
+        "_get_streams", "_recovery_steps", "_report", "_stall_threshold", "_step_timeout", "_check_interval",
+        "_recoveries", "_is_running",
+    )
+
+    def __init__(
+            self,
+            get_streams: Callable[[], list[GuildStream]],
+            recovery_steps: list[tuple[str, RecoveryAction]],
+            report: Callable[[StallIncident], Awaitable[None]],
+            stall_threshold: float = 2.0,
+            step_timeout: float = 10.0,
+    ):
+        """
+        :param get_streams: Returns the streams to watch (the ones that are supposed to be playing).
+        :param recovery_steps: Named recovery steps, in the order of escalation.
+        :param report: Called with each incident once it's over (recovered or not).
+        :param stall_threshold: Seconds without a frame after which a stream counts as stalled.
+        :param step_timeout: Seconds a recovery step may take before it counts as failed and the next one is tried
+                             (e.g. when closing or opening an input hangs).
+        """
+        self._get_streams: Callable[[], list[GuildStream]] = get_streams
+        self._recovery_steps: list[tuple[str, RecoveryAction]] = recovery_steps
+        self._report: Callable[[StallIncident], Awaitable[None]] = report
+        self._stall_threshold: float = stall_threshold
+        self._step_timeout: float = step_timeout
+        self._check_interval: float = stall_threshold / 4
+        # Recovery in progress (keyed by guild ID).
+        self._recoveries: dict[int, asyncio.Task] = {}
+        self._is_running: bool = False
+
+    def _find_stall(self, guild_stream: GuildStream, now: float) -> Optional[tuple[StallKind, float]]:
+        captured = guild_stream.captured
+        if not captured.is_running:
+            # The input has ended, that's not a stall.
+            return None
+
+        # Unclocked inputs (files, pipes, ...) are paced by the player, so only clocked ones can stall on their own.
+        capture_stalled_for: float = now - max(captured.last_frame_at, captured.started_at)
+        if captured.input_source.is_clocked and capture_stalled_for > self._stall_threshold:
+            return "capture", capture_stalled_for
+
+        player_stalled_for: float = now - max(captured.last_read_at, captured.started_at)
+        if player_stalled_for > self._stall_threshold:
+            return "player", player_stalled_for
+
+        return None
+
+    async def _wait_until_healthy(self, guild_stream: GuildStream, since: float) -> bool:
+        """
+        Wait (up to stall_threshold seconds) for a frame to be both captured and played after `since`.
+        """
+        deadline: float = time.monotonic() + self._stall_threshold
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+            captured = guild_stream.captured
+            if captured.last_frame_at > since and captured.last_read_at > since:
+                return True
+
+        return False
+
+    async def _recover(self, guild_stream: GuildStream, kind: StallKind, stalled_for: float):
+        guild_id: int = guild_stream.voice_client.guild.id
+        stalled_since: float = time.monotonic() - stalled_for
+        log.warning(f"{kind.capitalize()} of stream {guild_stream.captured.name} stalled "
+                    f"(no frames for {stalled_for:.2f} s), recovering ...")
+
+        steps: list[tuple[str, RecoveryAction]] = self._recovery_steps
+        if kind == "player":
+            steps = [(name, action) for name, action in steps if name == RECOVERY_STEP_REBUILD_PLAYER]
+
+        attempts: list[RecoveryAttempt] = []
+        recovered: bool = False
+        try:
+            for name, action in steps:
+                if guild_stream not in self._get_streams():
+                    log.info(f"Stream {guild_stream.captured.name} is no longer active, stopping its recovery.")
+                    return
+
+                step_started_at: float = time.monotonic()
+                error: Optional[str] = None
+                try:
+                    await asyncio.wait_for(action(guild_stream), timeout=self._step_timeout)
+                    recovered = await self._wait_until_healthy(guild_stream, step_started_at)
+                except asyncio.TimeoutError:
+                    error = f"timed out after {self._step_timeout:.1f} s"
+                except Exception as err:
+                    error = repr(err)
+
+                attempts.append(RecoveryAttempt(name, time.monotonic() - step_started_at, recovered, error))
+                log.info(f"Recovery step {name} for {guild_stream.captured.name}: "
+                         f"{'succeeded' if recovered else 'failed'}{f' ({error})' if error is not None else ''}.")
+                if recovered:
+                    break
+
+            incident = StallIncident(
+                stream_name=guild_stream.captured.name,
+                guild_id=guild_id,
+                kind=kind,
+                stalled_for=stalled_for,
+                attempts=tuple(attempts),
+                recovered=recovered,
+                outage=time.monotonic() - stalled_since,
+            )
+            try:
+                await self._report(incident)
+            except Exception as err:
+                log.error(f"Couldn't report the incident: {err!r}")
+
+        finally:
+            self._recoveries.pop(guild_id, None)
+
+    def is_recovering(self, guild_id: int) -> bool:
+        return guild_id in self._recoveries
+
+    async def run(self):
+        """
+        Watch the streams until stop() is called or the task is cancelled.
+        """
+        self._is_running = True
+        log.info(f"Watching the audio pipelines (stall threshold: {self._stall_threshold:.1f} s).")
+
+        while self._is_running:
+            await asyncio.sleep(self._check_interval)
+
+            now: float = time.monotonic()
+            for guild_stream in self._get_streams():
+                guild_id: int = guild_stream.voice_client.guild.id
+                if guild_id in self._recoveries:
+                    continue
+
+                stall = self._find_stall(guild_stream, now)
+                if stall is not None:
+                    self._recoveries[guild_id] = asyncio.create_task(
+                        self._recover(guild_stream, *stall), name=f"audiophage-recover-{guild_id}"
+                    )
+
+    def stop(self):
+        self._is_running = False
@@ -1,37 +1,131 @@
-from core.audio import device_index_to_device, host_api_index_to_name, PyAudioHostAPI, PyAudioDevice
+import argparse
+import dataclasses
+import json
+from typing import Optional
+
+from core.audio import device_index_to_device, host_api_index_to_name, PyAudioHostAPI, PyAudioDevice, \
+    PyAudioDeviceProbe, probe_input_device, get_audio
+
 
 def separator():
     print()
     print("=" * 20)
     print()
 
-print("This script will query and display available audio APIs and devices on your system.")
-print("Use this script to properly configure your configuration.toml file:")
-print("  - \"host_api_name\" should match the API name you wish to use (if unsure, use \"Windows WASAPI\"!);")
-print("  - \"input_device_name\" should match the exact device name "
-      "(the device should be available using the above API).")
 
-separator()
+def device_to_json(device: PyAudioDevice, probe: Optional[PyAudioDeviceProbe]) -> dict:
+    data = {
+        "name": device.name,
+        "index": device.index,
+        "default_sample_rate": device.default_sample_rate,
+    }
+    if probe is not None:
+        probe_data = dataclasses.asdict(probe)
+        del probe_data["device"]
+        data["probe"] = probe_data
 
-# Group devices by API
-devices_by_host_api: dict[PyAudioHostAPI, list[PyAudioDevice]] = {
-    api: [] for api in host_api_index_to_name.values()
-}
-for device in device_index_to_device.values():
-    devices_by_host_api[device.host_api].append(device)
+    return data
 
-devices_by_host_api = {
-    k: sorted(v, key=lambda d: d.name) for k, v in devices_by_host_api.items()
-}
 
+def format_probe(probe: PyAudioDeviceProbe) -> str:
+    lines = [
+        f"supported sample rates: {', '.join(str(rate) for rate in probe.supported_sample_rates) or 'none'}; "
+        f"channels: {', '.join(str(channels) for channels in probe.supported_channel_counts) or 'none'}",
+    ]
+    if probe.error is not None:
+        lines.append(f"can't open: {probe.error}")
+    else:
+        lines.append(
+            f"opened at {probe.probed_sample_rate} Hz, {probe.probed_channels} channels: "
+            f"input latency {probe.input_latency_ms} ms, first frame after {probe.time_to_first_frame_ms} ms, "
+            f"peak {probe.peak_dbfs} dBFS, RMS {probe.rms_dbfs} dBFS "
+            f"({'signal' if probe.has_signal else 'no signal (digital silence)'})"
+        )
+    lines.append("usable by Audiophage" if probe.is_usable else "NOT usable by Audiophage (needs 48 kHz stereo)")
 
-print("---- Available audio devices, grouped by audio APIs: ----")
-for host_api, devices in devices_by_host_api.items():
-    print(f"  API: \"{host_api.name}\" (id: {host_api.index}, {host_api.device_count} devices)")
-    for device in devices:
-        print(f"    \"{device.name}\" (id: {device.index}, sample rate: {device.default_sample_rate})")
-    print()
+    return "\n".join(f"      {line}" for line in lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List (and optionally probe) the available audio APIs and devices.")
+    parser.add_argument("--probe", action="store_true",
+                        help="Briefly open each input device to measure its latency and check for signal.")
+    parser.add_argument("--probe-seconds", type=float, default=0.5, help="How long to capture from each device.")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON instead.")
+    args = parser.parse_args()
+
+    # Initializes PortAudio and enumerates the host audio APIs and devices.
+    get_audio()
+
+    # Group devices by API
+    devices_by_host_api: dict[PyAudioHostAPI, list[PyAudioDevice]] = {
+        api: [] for api in host_api_index_to_name.values()
+    }
+    for device in device_index_to_device.values():
+        devices_by_host_api[device.host_api].append(device)
+
+    devices_by_host_api = {
+        k: sorted(v, key=lambda d: d.name) for k, v in devices_by_host_api.items()
+    }
+
+    # Output-only devices are left out when probing.
+    probes: dict[PyAudioDevice, Optional[PyAudioDeviceProbe]] = {}
+    if args.probe:
+        for device in device_index_to_device.values():
+            probes[device] = probe_input_device(device, args.probe_seconds)
+        devices_by_host_api = {
+            k: [d for d in v if probes[d] is not None] for k, v in devices_by_host_api.items()
+        }
+
+    if args.json:
+        print(json.dumps({
+            "host_apis": [
+                {
+                    "name": host_api.name,
+                    "index": host_api.index,
+                    "device_count": host_api.device_count,
+                    "devices": [device_to_json(device, probes.get(device)) for device in devices],
+                }
+                for host_api, devices in devices_by_host_api.items()
+            ]
+        }, indent=2))
+        return
+
+    print("This script will query and display available audio APIs and devices on your system.")
+    print("Use this script to properly configure your configuration.toml file:")
+    print("  - \"host_api_name\" should match the API name you wish to use (if unsure, use \"Windows WASAPI\"!);")
+    print("  - \"input_device_name\" should match the exact device name "
+          "(the device should be available using the above API).")
+    if not args.probe:
+        print("Run with --probe to measure the latency of each input device and check whether it's producing signal.")
+
+    separator()
+
+    print("---- Available audio devices, grouped by audio APIs: ----")
+    for host_api, devices in devices_by_host_api.items():
+        print(f"  API: \"{host_api.name}\" (id: {host_api.index}, {host_api.device_count} devices)")
+        for device in devices:
+            print(f"    \"{device.name}\" (id: {device.index}, sample rate: {device.default_sample_rate})")
+            if device in probes:
+                print(format_probe(probes[device]))
+        print()
+
+    if args.probe:
+        usable_probes = [
+            p for p in probes.values()
+            if p is not None and p.is_usable and p.error is None and p.has_signal
+        ]
+        if usable_probes:
+            best = min(usable_probes, key=lambda p: p.input_latency_ms)
+            print(f"Lowest latency usable device with signal: \"{best.device.name}\" "
+                  f"(API: \"{best.device.host_api.name}\", input latency {best.input_latency_ms} ms).")
+        else:
+            print("No usable input device with signal was found.")
+
+    separator()
+
+    print("---- END ----")
 
-separator()
 
-print("---- END ----")
+if __name__ == '__main__':
+    main()
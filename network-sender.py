@@ -0,0 +1,103 @@
+import argparse
+import logging
+import math
+import random
+import socket
+import struct
+import time
+
+from core.network_input import pack_rtp_packet, RTP_PAYLOAD_TYPE_OPUS, RTP_PAYLOAD_TYPE_PCM, \
+    FRAME_DURATION_MS, PCM_FRAME_SIZE
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("audiophage.sender")
+
+SAMPLES_PER_FRAME: int = PCM_FRAME_SIZE // 4
+
+
+def tone_frames(frequency: float):
+    """
+    Generate an endless sine tone as 20 ms frames of 16-bit 48 kHz stereo PCM (useful for loopback testing).
+    """
+    sample_index: int = 0
+    while True:
+        samples = [
+            int(8000 * math.sin(2 * math.pi * frequency * (sample_index + i) / 48000))
+            for i in range(SAMPLES_PER_FRAME)
+        ]
+        sample_index += SAMPLES_PER_FRAME
+        yield struct.pack(f"<{SAMPLES_PER_FRAME * 2}h", *[s for sample in samples for s in (sample, sample)])
+
+
+def device_frames(device_name: str, host_api_name: str):
+    """
+    Capture 20 ms frames of 16-bit 48 kHz stereo PCM from a local input device.
+    """
+    from core.audio import open_input_device
+
+    stream, frames_per_buffer = open_input_device(device_name, 48000, host_api_name)
+    try:
+        while True:
+            yield stream.read(frames_per_buffer)
+    finally:
+        stream.stop_stream()
+        stream.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Companion sender for Audiophage's network input: streams a local input device "
+                    "(or a test tone) to an Audiophage instance over RTP/UDP."
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address of the Audiophage instance.")
+    parser.add_argument("--port", type=int, default=50005, help="UDP port the Audiophage instance listens on.")
+    parser.add_argument("--codec", choices=["opus", "pcm"], default="opus",
+                        help="Must match audio.network.codec in the receiver's configuration.")
+    parser.add_argument("--bitrate", type=int, default=128, help="Opus bitrate in kbps.")
+
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--device", help="Input device name to stream (see list-audio-devices.py).")
+    source.add_argument("--tone", type=float, metavar="FREQUENCY", help="Stream a sine tone instead of a device.")
+    parser.add_argument("--host-api", default="Windows WASAPI", help="Host API of the input device.")
+    args = parser.parse_args()
+
+    encoder = None
+    if args.codec == "opus":
+        from discord.opus import Encoder
+        from core.audio import ensure_opus
+
+        ensure_opus()
+        encoder = Encoder()
+        encoder.set_bitrate(args.bitrate)
+
+    if args.tone is not None:
+        frames = tone_frames(args.tone)
+        # A generated tone has to be paced manually, a device is paced by its own clock.
+        paced = True
+    else:
+        frames = device_frames(args.device, args.host_api)
+        paced = False
+
+    payload_type: int = RTP_PAYLOAD_TYPE_OPUS if args.codec == "opus" else RTP_PAYLOAD_TYPE_PCM
+    ssrc: int = random.getrandbits(32)
+    sequence: int = random.getrandbits(16)
+    timestamp: int = random.getrandbits(32)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    log.info(f"Sending {args.codec} RTP audio to {args.host}:{args.port} (SSRC {ssrc:#x}).")
+
+    started_at = time.perf_counter()
+    for frame_index, pcm in enumerate(frames):
+        payload: bytes = encoder.encode(pcm, SAMPLES_PER_FRAME) if encoder is not None else pcm
+        sock.sendto(pack_rtp_packet(payload_type, sequence, timestamp, ssrc, payload), (args.host, args.port))
+
+        sequence += 1
+        timestamp += SAMPLES_PER_FRAME
+
+        if paced:
+            next_frame_at = started_at + (frame_index + 1) * FRAME_DURATION_MS / 1000
+            time.sleep(max(0.0, next_frame_at - time.perf_counter()))
+
+
+if __name__ == '__main__':
+    main()
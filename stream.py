@@ -1,23 +1,52 @@
+import sys
+import time
+
+from core.startup import StartupProfiler, STARTUP_PROFILE_FLAG
+
+# Created first, so it can time every import that follows (see --startup-profile).
+startup_profiler = StartupProfiler.from_arguments(sys.argv)
+started_at: float = time.perf_counter()
+
+import argparse
+import asyncio
+import io
 import logging
+import random
 
 from core.utilities import clamp
 
 logging.basicConfig(level=logging.INFO)
 
 import traceback
-from typing import Optional, Literal
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Awaitable, Callable, Optional, Literal
 
 from discord import Intents, Guild, VoiceChannel, VoiceClient, \
-    Client, Object, Interaction, Member, User, AudioSource, PCMVolumeTransformer
+    Client, Object, Interaction, Member, User, AudioSource, PCMVolumeTransformer, File, VoiceState
+from discord import ClientException, HTTPException
 from discord.abc import GuildChannel
-from discord.app_commands import CommandTree, describe, check, Range
+from discord.app_commands import CommandTree, describe, check, Range, autocomplete, Choice
 from discord.enums import ChannelType
 
 from core.audio import ensure_opus
 from core.audio_input import PyAudioInputSource
-from core.configuration import config
+from core.input_source import InputSource
+from core.network_input import NetworkInputSource
+from core.file_input import FileInputSource, PipeInputSource
+from core.profiling import SamplingProfiler, DeterministicProfiler, PROFILED_THREAD_CAPTURE, PROFILED_THREAD_PLAYER
+from core.noise_suppression import SpectralNoiseSuppressor, NoiseSuppressionTransformer
+from core.volume import PooledVolumeTransformer
+from core.event_loop import EventLoopLagMonitor, install_uvloop
+from core.capture import CaptureScheduler, CapturedSource
+from core.metering import MeterReading, format_reading
+from core.watchdog import PipelineWatchdog, StallIncident, \
+    RECOVERY_STEP_REREAD, RECOVERY_STEP_REOPEN_INPUT, RECOVERY_STEP_REBUILD_PLAYER
+from core.configuration import config, config_path, InputProfile, DEFAULT_INPUT_PROFILE_NAME
+from core.configuration_reload import ConfigurationWatcher, ConfigurationDiff
 from core.emojis import Emoji
-from core.state import AudiophageState
+from core.state import AudiophageState, GuildStream
+from core.session import SessionStore, SessionCheckpoint
 from core.exceptions import NotConnected, AudioException, NoSuchAudioDevice
 
 log = logging.getLogger("audiophage")
@@ -26,6 +55,25 @@ intents = Intents.all()
 client = Client(intents=intents)
 tree = CommandTree(client)
 state = AudiophageState()
+capture_scheduler = CaptureScheduler(meter_peak_hold_seconds=config.METER_PEAK_HOLD_SECONDS)
+profiling_lock = asyncio.Lock()
+loop_lag_monitor: Optional[EventLoopLagMonitor] = None
+loop_lag_monitor_task: Optional[asyncio.Task] = None
+meter_console_task: Optional[asyncio.Task] = None
+pipeline_watchdog: Optional[PipelineWatchdog] = None
+pipeline_watchdog_task: Optional[asyncio.Task] = None
+configuration_watcher: Optional[ConfigurationWatcher] = None
+configuration_watcher_task: Optional[asyncio.Task] = None
+# Set when running under the supervisor (see core.supervisor), reports the health of this instance.
+send_heartbeats: Optional[Callable[[], Awaitable[None]]] = None
+heartbeat_task: Optional[asyncio.Task] = None
+session_store = SessionStore(config.SESSION_PATH)
+# Streams to restore from the previous run and their inputs, opened while logging in (keyed by guild ID).
+restored_sessions: list[SessionCheckpoint] = []
+preopened_inputs: dict[int, Future] = {}
+is_session_restored: bool = False
+# Voice reconnection in progress (keyed by guild ID).
+reconnect_tasks: dict[int, asyncio.Task] = {}
 
 if len(config.GUILD_IDS) == 0:
     log.error("The configuration value permissions.guild_ids does not contain any guild IDs. "
@@ -38,8 +86,6 @@ if len(config.USER_IDS) == 0:
               "This effectively means the bot will not respond to anyone. Please add at least one "
               "user you want to operate the bot.")
 
-ensure_opus()
-
 ##
 # Utilities
 ##
@@ -71,45 +117,500 @@ def find_user_voice_channel(user: User) -> Optional[VoiceChannel]:
 
     return None
 
-async def connect_and_stream(voice_channel: VoiceChannel) -> VoiceClient:
+def create_input_source(profile: InputProfile) -> InputSource:
+    """
+    Open the input of an audio profile (see "input_type" in the "audio" table of configuration.toml).
+    """
+    if profile.input_type == "network":
+        return NetworkInputSource.create(
+            profile.network_bind_host,
+            profile.network_port,
+            profile.network_codec,
+            profile.network_jitter_buffer_ms,
+        )
+    elif profile.input_type == "file":
+        return FileInputSource.create(profile.file_path, profile.file_loop)
+    elif profile.input_type == "pipe":
+        return PipeInputSource.create(profile.pipe_path, profile.pipe_bulk_frames)
+
+    return PyAudioInputSource.create(
+        profile.input_device_name,
+        profile.host_api_name,
+    )
+
+def build_pipeline(
+        captured_frames: AudioSource,
+        volume: float,
+        noise_suppression_enabled: bool,
+        noise_reduction_db: float,
+) -> AudioSource:
     """
-    Connect to a VoiceChannel and start streaming the configured input device.
+    Build the processing pipeline (run by the capture thread) on top of the captured frames.
+    """
+    if captured_frames.is_opus():
+        # Opus is passed straight through, it can't be processed without decoding it.
+        return captured_frames
+
+    denoised_source = NoiseSuppressionTransformer(
+        captured_frames,
+        SpectralNoiseSuppressor(
+            reduction_db=noise_reduction_db,
+            learning_seconds=config.NOISE_SUPPRESSION_LEARNING_SECONDS,
+        ),
+        enabled=noise_suppression_enabled,
+    )
+    return PooledVolumeTransformer(denoised_source, volume)
+
+def session_checkpoint(guild_stream: GuildStream) -> SessionCheckpoint:
+    volume: Optional[float] = None
+    noise_suppression_enabled: Optional[bool] = None
+    noise_reduction_db: Optional[float] = None
+
+    pipeline: AudioSource = guild_stream.pipeline
+    if isinstance(pipeline, PCMVolumeTransformer):
+        volume = pipeline.volume
+        if isinstance(pipeline.original, NoiseSuppressionTransformer):
+            noise_suppression_enabled = pipeline.original.enabled
+            noise_reduction_db = pipeline.original.suppressor.reduction_db
+
+    profile: Optional[InputProfile] = config.INPUT_PROFILES.get(guild_stream.profile_name)
+    return SessionCheckpoint(
+        guild_id=guild_stream.voice_client.guild.id,
+        voice_channel_id=guild_stream.voice_client.channel.id,
+        profile_name=guild_stream.profile_name,
+        input_device_name=profile.input_device_name if profile is not None else None,
+        volume=volume,
+        noise_suppression_enabled=noise_suppression_enabled,
+        noise_reduction_db=noise_reduction_db,
+    )
+
+def pipeline_builder_for(checkpoint: Optional[SessionCheckpoint]) -> Callable[[AudioSource], AudioSource]:
+    """
+    Get a build_pipeline with the settings of a checkpoint (or the configured initial settings if None).
+    """
+    if checkpoint is not None and checkpoint.volume is not None:
+        return partial(
+            build_pipeline,
+            volume=checkpoint.volume,
+            noise_suppression_enabled=bool(checkpoint.noise_suppression_enabled),
+            # A saved reduction of 0 dB is a valid setting, only fall back if none was saved.
+            noise_reduction_db=checkpoint.noise_reduction_db if checkpoint.noise_reduction_db is not None
+            else config.NOISE_SUPPRESSION_REDUCTION_DB,
+        )
+
+    return partial(
+        build_pipeline,
+        volume=config.INITIAL_VOLUME,
+        noise_suppression_enabled=config.NOISE_SUPPRESSION_ENABLED,
+        noise_reduction_db=config.NOISE_SUPPRESSION_REDUCTION_DB,
+    )
+
+def checkpoint_session():
+    """
+    Save the active streams (and their settings) so they can be restored after a restart.
+    Call after every change, the file is written atomically in a worker thread.
+    """
+    session_store.update([session_checkpoint(guild_stream) for guild_stream in state.streams])
+    asyncio.get_running_loop().run_in_executor(None, session_store.flush)
+
+async def connect_and_stream(
+        voice_channel: VoiceChannel,
+        profile: InputProfile,
+        input_source: Optional[InputSource] = None,
+        checkpoint: Optional[SessionCheckpoint] = None,
+) -> VoiceClient:
+    """
+    Connect to a VoiceChannel and start streaming the input of an audio profile.
+    Each stream has its own capture thread (see core.capture), so multiple guilds can be streamed to at once.
 
     :param voice_channel: VoiceChannel to connect and stream to.
+    :param profile: Audio profile to stream.
+    :param input_source: Already opened input of the profile (opened here if None).
+    :param checkpoint: Restore the volume and noise suppression settings of a previous session.
     :return: VoiceClient
     """
-    input_source = PyAudioInputSource.create(
-        config.AUDIO_INPUT_DEVICE_NAME,
-        config.AUDIO_HOST_API_NAME,
-    )
-    volume_source = PCMVolumeTransformer(input_source, config.INITIAL_VOLUME)
+    if input_source is None:
+        # Opening the input initializes PortAudio on the first stream, which blocks for a while.
+        input_source = await asyncio.to_thread(create_input_source, profile)
 
-    voice_client: VoiceClient = await voice_channel.connect()
+    try:
+        # Deferred until the first stream (loading the library takes a while).
+        await asyncio.to_thread(ensure_opus)
+        voice_client: VoiceClient = await voice_channel.connect()
+    except BaseException:
+        input_source.cleanup()
+        raise
 
-    voice_client.play(volume_source)
-    state.set_stream_started(voice_client)
+    captured = capture_scheduler.start(
+        input_source, pipeline_builder_for(checkpoint), f"{voice_channel.guild.id}-{profile.name}"
+    )
+    state.set_stream_started(voice_client, profile.name, captured)
+    play_captured(voice_client, captured)
+    checkpoint_session()
 
     return voice_client
 
-async def stop_stream_and_disconnect() -> VoiceChannel:
+def play_captured(voice_client: VoiceClient, captured: CapturedSource):
+    """
+    Play a captured stream on a voice client, handling the player stopping (see on_player_stopped).
+    """
+    guild_id: int = voice_client.guild.id
+    loop = asyncio.get_running_loop()
+
+    def after(error: Optional[Exception]):
+        # Runs in the player thread.
+        if error is not None:
+            log.error(f"Player in guild {guild_id} crashed: {error!r}")
+        loop.call_soon_threadsafe(on_player_stopped, guild_id, captured)
+
+    voice_client.play(captured, after=after)
+
+def on_player_stopped(guild_id: int, captured: CapturedSource):
+    """
+    The player of a captured stream has stopped: either the input has ended or the voice connection was lost
+    (discord.py retries dropped voice websockets by itself, the player only stops once it gives up).
+    """
+    guild_stream: Optional[GuildStream] = state.get(guild_id)
+    if guild_stream is None or guild_stream.captured is not captured or guild_id in reconnect_tasks:
+        # The stream was stopped on purpose or is already being reconnected.
+        return
+
+    if not captured.is_running:
+        log.info(f"Input of the stream in guild {guild_id} has ended, leaving.")
+        asyncio.create_task(stop_stream_and_disconnect(guild_id))
+        return
+
+    if guild_stream.voice_client.guild.me.voice is None:
+        # Disconnected through the gateway, not by losing the connection (see on_voice_state_update).
+        log.info(f"Disconnected from the voice channel in guild {guild_id}, stopping the stream.")
+        asyncio.create_task(stop_stream_and_disconnect(guild_id))
+        return
+
+    if pipeline_watchdog is not None and guild_stream.voice_client.is_connected():
+        # Still connected, so the player itself stopped (e.g. it crashed): that's for the watchdog to recover.
+        if not pipeline_watchdog.is_recovering(guild_id):
+            log.warning(f"Player in guild {guild_id} stopped while connected, the watchdog will rebuild it.")
+        return
+
+    if not config.VOICE_RECONNECT_ENABLED:
+        log.warning(f"Lost the voice connection in guild {guild_id}, stopping the stream (reconnecting is disabled).")
+        asyncio.create_task(stop_stream_and_disconnect(guild_id))
+        return
+
+    log.warning(f"Lost the voice connection in guild {guild_id}, reconnecting ...")
+    # The outage started when the player stopped getting frames out, not when it gave up on the connection.
+    disconnected_at: float = captured.last_read_at or time.monotonic()
+    task = asyncio.create_task(reconnect_stream(guild_stream, disconnected_at))
+    reconnect_tasks[guild_id] = task
+    task.add_done_callback(lambda _: reconnect_tasks.pop(guild_id, None))
+
+async def wait_for_first_read(captured: CapturedSource, since: float, timeout: float = 5.0) -> Optional[float]:
+    """
+    Wait for the player to read the first frame of a captured stream after `since` (a time.monotonic() value).
+
+    :return: time.monotonic() of the read, or None if the player didn't read anything in `timeout` seconds.
+    """
+    deadline: float = time.monotonic() + timeout
+    while captured.last_read_at <= since:
+        if time.monotonic() >= deadline:
+            return None
+        await asyncio.sleep(0.005)
+
+    return captured.last_read_at
+
+async def reconnect_stream(guild_stream: GuildStream, disconnected_at: float):
+    """
+    Reconnect to the voice channel of a stream whose voice connection was lost (with exponential backoff)
+    and re-attach its still running capture thread, so the input, volume and noise suppression settings are kept.
+
+    :param guild_stream: Stream to reconnect.
+    :param disconnected_at: time.monotonic() of the player's last read before the disconnect
+                            (for measuring the outage).
+    """
+    old_voice_client: VoiceClient = guild_stream.voice_client
+    guild_id: int = old_voice_client.guild.id
+    voice_channel_id: int = old_voice_client.channel.id
+    delay: float = config.VOICE_RECONNECT_INITIAL_DELAY_SECONDS
+
+    for attempt in range(1, config.VOICE_RECONNECT_MAX_ATTEMPTS + 1):
+        voice_channel = client.get_channel(voice_channel_id)
+        if voice_channel is None:
+            log.warning(f"Voice channel {voice_channel_id} no longer exists, can't reconnect.")
+            break
+
+        try:
+            # discord.py keeps a voice client registered until it's disconnected, which blocks connecting again.
+            if voice_channel.guild.voice_client is not None:
+                await voice_channel.guild.voice_client.disconnect(force=True)
+
+            voice_client: VoiceClient = await voice_channel.connect()
+        except (ClientException, asyncio.TimeoutError, OSError) as err:
+            # Spread out the retries of streams that were disconnected at the same time.
+            retry_in: float = delay * random.uniform(0.8, 1.2)
+            log.warning(f"Reconnect attempt {attempt}/{config.VOICE_RECONNECT_MAX_ATTEMPTS} in guild {guild_id} "
+                        f"failed: {err!r}, retrying in {retry_in:.1f} s.")
+            await asyncio.sleep(retry_in)
+            delay = min(delay * 2, config.VOICE_RECONNECT_MAX_DELAY_SECONDS)
+            continue
+
+        if state.get(guild_id) is not guild_stream:
+            # Stopped (/leave) while reconnecting.
+            await voice_client.disconnect()
+            return
+
+        guild_stream.voice_client = voice_client
+        attached_at: float = time.monotonic()
+        play_captured(voice_client, guild_stream.captured)
+
+        first_read_at: Optional[float] = await wait_for_first_read(guild_stream.captured, attached_at)
+        if first_read_at is None:
+            log.warning(f"Reconnected to {voice_channel} in {voice_channel.guild.name} (attempt {attempt}), "
+                        f"but the player hasn't resumed yet.")
+        else:
+            log.info(f"Reconnected to {voice_channel} in {voice_channel.guild.name} (attempt {attempt}): "
+                     f"audio resumed {first_read_at - disconnected_at:.2f} s after the disconnect.")
+
+        checkpoint_session()
+        return
+
+    log.error(f"Couldn't reconnect in guild {guild_id}, stopping the stream.")
+    if state.get(guild_id) is guild_stream:
+        await stop_stream_and_disconnect(guild_id)
+
+async def reread_input(guild_stream: GuildStream):
+    """
+    The first recovery step of a stalled stream: a hanging read can't be interrupted, but the capture thread
+    continues on its own once it returns (e.g. after a driver hiccup), so just give it another chance
+    before touching the input.
+    """
+    log.info(f"Waiting for the pending read of {guild_stream.captured.name} to return.")
+
+async def swap_input(guild_stream: GuildStream, close_first: bool):
+    """
+    Capture a stream's input anew from its (current) audio profile, keeping the voice connection and the settings.
+
+    :param guild_stream: Stream to swap the input of.
+    :param close_first: Close the current input before opening the new one. Otherwise the new input is opened
+                        while the current one keeps playing (falling back to closing it first if that fails,
+                        e.g. the same device or port can't be opened twice).
+    """
+    previous: CapturedSource = guild_stream.captured
+    profile: InputProfile = config.INPUT_PROFILES[guild_stream.profile_name]
+    checkpoint: SessionCheckpoint = session_checkpoint(guild_stream)
+
+    input_source: Optional[InputSource] = None
+    if not close_first:
+        try:
+            input_source = await asyncio.to_thread(create_input_source, profile)
+        except (AudioException, NoSuchAudioDevice, OSError) as err:
+            log.info(f"Couldn't open the new input of {previous.name} alongside the current one ({err}), "
+                     f"closing the current one first.")
+
+    await asyncio.to_thread(capture_scheduler.stop, previous)
+    if input_source is None:
+        input_source = await asyncio.to_thread(create_input_source, profile)
+
+    guild_stream.captured = capture_scheduler.start(input_source, pipeline_builder_for(checkpoint), previous.name)
+    guild_stream.voice_client.stop()
+    play_captured(guild_stream.voice_client, guild_stream.captured)
+
+async def reopen_input(guild_stream: GuildStream):
+    """
+    The second recovery step of a stalled stream: close its input and capture it anew (keeping the settings).
+    """
+    # Close the stalled input first, some devices can't be opened twice.
+    await swap_input(guild_stream, close_first=True)
+
+async def rebuild_player(guild_stream: GuildStream):
+    """
+    The last recovery step of a stalled stream (the first for a stalled player): replace the player.
+    """
+    if not guild_stream.captured.is_running:
+        # The previous step stopped the stalled capture, but couldn't reopen the input.
+        await reopen_input(guild_stream)
+        return
+
+    guild_stream.voice_client.stop()
+    play_captured(guild_stream.voice_client, guild_stream.captured)
+
+async def notify_whitelisted_users(message: str):
+    for user_id in config.USER_IDS:
+        try:
+            user: User = client.get_user(user_id) or await client.fetch_user(user_id)
+            await user.send(message)
+        except HTTPException as err:
+            log.warning(f"Couldn't send a direct message to user {user_id}: {err}")
+
+async def report_stall_incident(incident: StallIncident):
+    message: str = incident.format()
+
+    if incident.recovered:
+        log.warning(message)
+    else:
+        log.error(message)
+        if state.get(incident.guild_id) is not None:
+            # Don't pretend to be streaming if nothing can be heard.
+            await stop_stream_and_disconnect(incident.guild_id)
+            message += " Stopped the stream."
+
+    if config.WATCHDOG_NOTIFY_USERS:
+        await notify_whitelisted_users(f"{Emoji.WARNING if incident.recovered else Emoji.CROSS} {message}")
+
+async def on_configuration_changed(changes: ConfigurationDiff):
+    """
+    Act on the reloaded configuration (see core.configuration_reload), the new values are already in `config`.
+    Permissions (is_whitelisted_user) and the initial settings of new streams read them as they're needed,
+    changed audio profiles are swapped in place in the streams using them.
+    """
+    if "USER_IDS" in changes:
+        log.info(f"Whitelisted user IDs are now: {', '.join(str(user_id) for user_id in config.USER_IDS)}.")
+
+    if "INPUT_PROFILES" not in changes:
+        return
+
+    old_profiles, new_profiles = changes["INPUT_PROFILES"]
+    for guild_stream in list(state.streams):
+        name: str = guild_stream.profile_name
+        if old_profiles.get(name) == new_profiles.get(name):
+            continue
+        if name not in new_profiles:
+            log.warning(f"Audio profile {name} (streamed by {guild_stream.captured.name}) was removed "
+                        f"from the configuration, the stream keeps its current input.")
+            continue
+
+        guild_id: int = guild_stream.voice_client.guild.id
+        if guild_id in reconnect_tasks or (pipeline_watchdog is not None and pipeline_watchdog.is_recovering(guild_id)):
+            # Reconnecting and recovering both capture the input anew from the (already changed) profile.
+            continue
+
+        log.info(f"Audio profile {name} changed, swapping the input of {guild_stream.captured.name} in place.")
+        swap_started_at: float = time.monotonic()
+        try:
+            await swap_input(guild_stream, close_first=False)
+        except (AudioException, NoSuchAudioDevice, OSError) as err:
+            log.error(f"Couldn't open the changed input of {guild_stream.captured.name}: {err}")
+            await stop_stream_and_disconnect(guild_id)
+            continue
+
+        log.info(f"Swapped the input of {guild_stream.captured.name} "
+                 f"in {(time.monotonic() - swap_started_at) * 1000:.0f} ms.")
+
+    checkpoint_session()
+
+def watched_streams() -> list[GuildStream]:
+    # Streams being reconnected (see reconnect_stream) are not supposed to be playing.
+    return [
+        guild_stream for guild_stream in state.streams
+        if guild_stream.voice_client.is_connected() and guild_stream.voice_client.guild.id not in reconnect_tasks
+    ]
+
+async def stop_stream_and_disconnect(guild_id: Optional[int]) -> VoiceChannel:
     """
-    Disconnect from the current audio stream (if connected) and leave the voice channel.
+    Disconnect from a guild's audio stream (if connected) and leave the voice channel.
 
+    :param guild_id: ID of the guild to stop streaming in.
     :return: VoiceChannel we just disconnected from.
     """
-    voice_client: Optional[VoiceClient] = state.stream
-    if voice_client is None:
+    guild_stream: Optional[GuildStream] = state.get(guild_id)
+    if guild_stream is None:
         raise NotConnected()
 
+    voice_client: VoiceClient = guild_stream.voice_client
     voice_channel: VoiceChannel = voice_client.channel
 
+    # Ended first, so the player stopping isn't mistaken for a lost connection.
+    state.set_stream_ended(guild_id)
+    reconnect_task: Optional[asyncio.Task] = reconnect_tasks.get(guild_id)
+    if reconnect_task is not None and reconnect_task is not asyncio.current_task():
+        reconnect_task.cancel()
+
     voice_client.stop()
-    await voice_client.disconnect()
+    await voice_client.disconnect(force=True)
+    # Joins the capture thread, don't block the event loop while it finishes its last read.
+    await asyncio.to_thread(capture_scheduler.stop, guild_stream.captured)
 
-    state.set_stream_ended()
+    checkpoint_session()
 
     return voice_channel
 
+def preopen_session_inputs():
+    """
+    Load the streams that were active when the bot last stopped and start opening their inputs in worker threads,
+    so opening the devices overlaps with logging in (called before client.run).
+    """
+    checkpoints: list[SessionCheckpoint] = session_store.load()
+    if len(checkpoints) == 0:
+        return
+
+    log.info(f"Restoring {len(checkpoints)} streams from {session_store.path}, opening their inputs ...")
+
+    executor = ThreadPoolExecutor(max_workers=len(checkpoints), thread_name_prefix="audiophage-restore")
+    opened_profiles: set[str] = set()
+    for checkpoint in checkpoints:
+        profile: Optional[InputProfile] = config.INPUT_PROFILES.get(checkpoint.profile_name)
+        if profile is None or profile.name in opened_profiles:
+            log.warning(f"Not restoring the stream in guild {checkpoint.guild_id}: audio profile "
+                        f"{checkpoint.profile_name} doesn't exist or is already used by another restored stream.")
+            continue
+
+        opened_profiles.add(profile.name)
+        restored_sessions.append(checkpoint)
+        preopened_inputs[checkpoint.guild_id] = executor.submit(create_input_source, profile)
+
+    executor.shutdown(wait=False)
+
+def discard_preopened_input(input_future: Future):
+    def close_input(future: Future):
+        if future.exception() is None:
+            future.result().cleanup()
+
+    input_future.add_done_callback(close_input)
+
+async def restore_session(checkpoint: SessionCheckpoint) -> bool:
+    """
+    Rejoin the voice channel of a previous session and resume streaming with its settings.
+
+    :return: Whether the stream was restored.
+    """
+    input_future: Future = preopened_inputs.pop(checkpoint.guild_id)
+    profile: InputProfile = config.INPUT_PROFILES[checkpoint.profile_name]
+
+    voice_channel = client.get_channel(checkpoint.voice_channel_id)
+    if voice_channel is None or voice_channel.type != ChannelType.voice \
+            or voice_channel.guild.id not in config.GUILD_IDS or state.get(voice_channel.guild.id) is not None:
+        log.warning(f"Not restoring the stream in guild {checkpoint.guild_id}: voice channel "
+                    f"{checkpoint.voice_channel_id} is not available.")
+        discard_preopened_input(input_future)
+        return False
+
+    try:
+        input_source: InputSource = await asyncio.wrap_future(input_future)
+        await connect_and_stream(voice_channel, profile, input_source, checkpoint)
+
+    except (AudioException, NoSuchAudioDevice) as err:
+        log.error(f"Couldn't restore the stream in {voice_channel.guild.name}, audio error: {err!r}")
+        return False
+
+    except Exception as err:
+        log.error(f"Couldn't restore the stream in {voice_channel.guild.name}: {err!r}")
+        traceback.print_exc()
+        return False
+
+    log.info(f"Restored the stream in {voice_channel.guild.name}: {voice_channel} "
+             f"(profile: {profile.name}, volume: {checkpoint.volume}).")
+    return True
+
+async def restore_sessions():
+    if len(restored_sessions) == 0:
+        return
+
+    results: list[bool] = await asyncio.gather(*[restore_session(checkpoint) for checkpoint in restored_sessions])
+    log.info(f"Restored {sum(results)}/{len(results)} streams "
+             f"{time.perf_counter() - started_at:.1f} s after starting.")
+
+    # Forget the streams that couldn't be restored.
+    checkpoint_session()
+
 
 def is_whitelisted_user(interaction: Interaction):
     """
@@ -119,22 +620,126 @@ def is_whitelisted_user(interaction: Interaction):
     return user.id in config.USER_IDS
 
 
+async def autocomplete_profile(interaction: Interaction, current: str) -> list[Choice[str]]:
+    return [
+        Choice(name=name, value=name) for name in config.INPUT_PROFILES
+        if current.lower() in name.lower()
+    ][:25]
+
+
+async def log_meters(interval: float):
+    """
+    Periodically log a level meter line for each processed stream (see "console_interval_seconds" in audio.meter).
+    """
+    while True:
+        await asyncio.sleep(interval)
+
+        for guild_stream in state.streams:
+            if guild_stream.captured.is_opus():
+                continue
+
+            reading: MeterReading = guild_stream.captured.meter.reading()
+            log.info(f"Meter {guild_stream.captured.name}: {format_reading(reading)}")
+
+
 ##
 # Event listeners
 ##
+@client.event
+async def setup_hook():
+    global loop_lag_monitor
+    global loop_lag_monitor_task
+    global meter_console_task
+    global pipeline_watchdog
+    global pipeline_watchdog_task
+    global configuration_watcher
+    global configuration_watcher_task
+    global heartbeat_task
+
+    # Runs once (before connecting to the gateway), unlike on_ready.
+    startup_profiler.mark("Logged in (setup_hook)")
+
+    if send_heartbeats is not None:
+        # Sent from the event loop (not a separate thread), so the supervisor notices if it hangs.
+        heartbeat_task = asyncio.create_task(send_heartbeats(), name="audiophage-heartbeat")
+
+    if config.EVENT_LOOP_LAG_MONITOR_ENABLED:
+        loop_lag_monitor = EventLoopLagMonitor(
+            warning_threshold=config.EVENT_LOOP_LAG_WARNING_MS / 1000,
+            report_interval=config.EVENT_LOOP_LAG_REPORT_INTERVAL_SECONDS,
+        )
+        loop_lag_monitor_task = asyncio.create_task(loop_lag_monitor.run(), name="audiophage-loop-lag-monitor")
+
+    if config.WATCHDOG_ENABLED:
+        pipeline_watchdog = PipelineWatchdog(
+            watched_streams,
+            [
+                (RECOVERY_STEP_REREAD, reread_input),
+                (RECOVERY_STEP_REOPEN_INPUT, reopen_input),
+                (RECOVERY_STEP_REBUILD_PLAYER, rebuild_player),
+            ],
+            report_stall_incident,
+            stall_threshold=config.WATCHDOG_STALL_THRESHOLD_SECONDS,
+        )
+        pipeline_watchdog_task = asyncio.create_task(pipeline_watchdog.run(), name="audiophage-pipeline-watchdog")
+
+    if config.METER_CONSOLE_INTERVAL_SECONDS > 0:
+        meter_console_task = asyncio.create_task(
+            log_meters(config.METER_CONSOLE_INTERVAL_SECONDS), name="audiophage-meter-console"
+        )
+
+    if config.RELOAD_ENABLED:
+        configuration_watcher = ConfigurationWatcher(
+            config, config_path, on_configuration_changed, poll_interval=config.RELOAD_POLL_INTERVAL_SECONDS
+        )
+        configuration_watcher_task = asyncio.create_task(
+            configuration_watcher.run(), name="audiophage-configuration-watcher"
+        )
+
+@client.event
+async def on_voice_state_update(member: Member, before: VoiceState, after: VoiceState):
+    if member.id != client.user.id or before.channel is None or after.channel is not None:
+        return
+
+    guild_id: int = member.guild.id
+    if state.get(guild_id) is None or guild_id in reconnect_tasks:
+        # Left on purpose (/leave) or disconnected while reconnecting.
+        return
+
+    # Someone (e.g. a moderator) disconnected the bot: that's not a lost connection, so don't reconnect.
+    log.info(f"Disconnected from {before.channel} in {member.guild.name}, stopping the stream.")
+    try:
+        await stop_stream_and_disconnect(guild_id)
+    except NotConnected:
+        # Already stopped once the player noticed (see on_player_stopped).
+        pass
+
 @client.event
 async def on_ready():
+    global is_session_restored
+
     log.info(f"Logged in as bot {client.user.name}#{client.user.discriminator} ({client.user.id}).")
+    startup_profiler.mark("Connected to the gateway (on_ready)")
+
+    # Resume the previous session first (on_ready also runs after reconnecting to the gateway, restore only once).
+    if not is_session_restored:
+        is_session_restored = True
+        with startup_profiler.step("Restoring the session"):
+            await restore_sessions()
 
     # Sync global and guild slash commands.
     log.info(f"Syncing global slash commands.")
-    await tree.sync()
+    with startup_profiler.step("Syncing slash commands"):
+        await tree.sync()
+
+        for guild_id in config.GUILD_IDS:
+            guild: Guild = client.get_guild(guild_id)
+            if guild is not None:
+                log.info(f"Syncing slash commands for guild: {guild.name} ({guild.id}).")
+                await tree.sync(guild=guild)
 
-    for guild_id in config.GUILD_IDS:
-        guild: Guild = client.get_guild(guild_id)
-        if guild is not None:
-            log.info(f"Syncing slash commands for guild: {guild.name} ({guild.id}).")
-            await tree.sync(guild=guild)
+    # Ready to take commands (does nothing after the first on_ready or without --startup-profile).
+    startup_profiler.finish()
 
     # List whitelisted user info
     whitelisted_users: list[User] = [client.get_user(i) for i in config.USER_IDS]
@@ -148,10 +753,20 @@ async def on_ready():
             log.warning(f"Auto-join was enabled, but can't find voice channel!")
             return
 
-        log.info(f"Auto-join is enabled! Joining {primary_voice}!")
+        log.info(f"Auto-join is enabled! Joining {primary_voice} (profile: {config.AUTO_JOIN_PROFILE})!")
+
+        if state.get(primary_voice.guild.id) is not None:
+            log.info("Already streaming in the auto-join guild (reconnected to the gateway), not joining again.")
+            return
+
+        profile_stream: Optional[GuildStream] = state.find_by_profile(config.AUTO_JOIN_PROFILE)
+        if profile_stream is not None:
+            log.warning(f"Can't auto-join: profile {config.AUTO_JOIN_PROFILE} is already streaming "
+                        f"to {profile_stream.voice_client.guild} (its input can only be opened once).")
+            return
 
         try:
-            await connect_and_stream(primary_voice)
+            await connect_and_stream(primary_voice, config.INPUT_PROFILES[config.AUTO_JOIN_PROFILE])
         except AudioException as err:
             log.error(f"Couldn't auto-join, audio error: {err}")
             traceback.print_exc()
@@ -178,17 +793,21 @@ async def cmd_ping(interaction: Interaction):
     guilds=valid_guilds,
 )
 @describe(
-    where="\"me\" - voice channel you're currently in; \"primary\" - the auto-join-configured channel."
+    where="\"me\" - voice channel you're currently in; \"primary\" - the auto-join-configured channel.",
+    profile="Audio profile (input) to stream, see audio.profiles in the configuration (default: \"default\")."
 )
+@autocomplete(profile=autocomplete_profile)
 @check(is_whitelisted_user)
-async def cmd_join(interaction: Interaction, where: Literal["me", "primary"]):
-    log.info(f"User {interaction.user} requested: join.")
+async def cmd_join(interaction: Interaction, where: Literal["me", "primary"], profile: Optional[str] = None):
+    profile_name: str = profile or DEFAULT_INPUT_PROFILE_NAME
+    log.info(f"User {interaction.user} requested: join (profile: {profile_name}).")
 
-    already_streaming: bool = state.stream is not None
-    if already_streaming:
-        log.info("Can't join: already streaming somewhere else.")
+    input_profile: Optional[InputProfile] = config.INPUT_PROFILES.get(profile_name)
+    if input_profile is None:
+        log.info(f"Can't join: no audio profile named {profile_name}.")
         await interaction.response.send_message(
-            f"{Emoji.WARNING} Can't join: already streaming somewhere else - only a single stream is supported.",
+            f"{Emoji.WARNING} Can't join: there is no audio profile named `{profile_name}` "
+            f"(available: {', '.join(f'`{name}`' for name in config.INPUT_PROFILES)}).",
             ephemeral=True
         )
         return
@@ -219,25 +838,49 @@ async def cmd_join(interaction: Interaction, where: Literal["me", "primary"]):
         )
         return
 
-    try:
-        await connect_and_stream(voice_channel)
-        log.info(f"Voice channel joined and streaming: {voice_channel} ({voice_channel.id}).")
+    if state.get(voice_channel.guild.id) is not None:
+        log.info(f"Can't join: already streaming in {voice_channel.guild.name}.")
         await interaction.response.send_message(
-            f"{Emoji.POSTAL_HORN} Joined voice channel: {voice_channel.mention} (volume: `{config.INITIAL_VOLUME}`).",
+            f"{Emoji.WARNING} Can't join: already streaming in this server - only a single stream per server "
+            f"is supported (use `/leave` first).",
+            ephemeral=True
+        )
+        return
+
+    profile_stream: Optional[GuildStream] = state.find_by_profile(profile_name)
+    if profile_stream is not None:
+        log.info(f"Can't join: profile {profile_name} is already streaming to {profile_stream.voice_client.guild}.")
+        await interaction.response.send_message(
+            f"{Emoji.WARNING} Can't join: the audio profile `{profile_name}` is already streaming "
+            f"in another server (its input can only be opened once).",
+            ephemeral=True
+        )
+        return
+
+    # Opening the input (initializing PortAudio on the first stream), loading Opus and the voice handshake
+    # can take longer than the interaction may go unanswered.
+    await interaction.response.defer(ephemeral=True, thinking=True)
+
+    try:
+        await connect_and_stream(voice_channel, input_profile)
+        log.info(f"Voice channel joined and streaming {profile_name}: {voice_channel} ({voice_channel.id}).")
+        await interaction.followup.send(
+            f"{Emoji.POSTAL_HORN} Joined voice channel: {voice_channel.mention} "
+            f"(profile: `{profile_name}`, volume: `{config.INITIAL_VOLUME}`).",
             ephemeral=True
         )
 
     except AudioException as err:
         log.error(f"Couldn't join voice channel, audio error: {err}")
         traceback.print_exc()
-        await interaction.response.send_message(content=f"{Emoji.EYES} Error while opening input audio stream!",
-                                                ephemeral=True)
+        await interaction.followup.send(content=f"{Emoji.EYES} Error while opening input audio stream!",
+                                        ephemeral=True)
 
     except NoSuchAudioDevice:
         log.error("Couldn't open stream: the configured audio device does not exist.")
-        await interaction.response.send_message(content=f"{Emoji.EYES} The configured audio input device does not exist"
-                                                        f" (disconnected or otherwise unavailable)!",
-                                                ephemeral=True)
+        await interaction.followup.send(content=f"{Emoji.EYES} The configured audio input device does not exist"
+                                                f" (disconnected or otherwise unavailable)!",
+                                        ephemeral=True)
 
 
 @tree.command(
@@ -250,7 +893,7 @@ async def cmd_leave(interaction: Interaction):
     log.info(f"User {interaction.user} requested: leave.")
 
     try:
-        voice_channel: VoiceChannel = await stop_stream_and_disconnect()
+        voice_channel: VoiceChannel = await stop_stream_and_disconnect(interaction.guild_id)
 
     except NotConnected:
         log.info("Can't leave: not connected.")
@@ -275,14 +918,20 @@ async def cmd_leave(interaction: Interaction):
 async def cmd_volume(interaction: Interaction, volume: Range[float, 0, 2]):
     log.info(f"User {interaction.user} requested: set volume to {volume}")
 
-    voice_client: Optional[VoiceClient] = state.stream
-    if voice_client is None:
+    guild_stream: Optional[GuildStream] = state.get(interaction.guild_id)
+    if guild_stream is None:
         log.info("Can't set volume: not connected.")
         await interaction.response.send_message(f"{Emoji.WARNING} Can't set volume: not connected.",
                                                 ephemeral=True)
         return
 
-    source: AudioSource = voice_client.source
+    source: AudioSource = guild_stream.pipeline
+    if source.is_opus():
+        log.info("Can't set volume: Opus input is passed through without processing.")
+        await interaction.response.send_message(f"{Emoji.WARNING} Can't set volume: the network input "
+                                                f"streams Opus as-is (use the pcm codec to change the volume).",
+                                                ephemeral=True)
+        return
     if not isinstance(source, PCMVolumeTransformer):
         log.error("Can't change volume: source is not a PCMVolumeTransformer!")
         await interaction.response.send_message(f"{Emoji.EYES} Can't change volume: "
@@ -293,12 +942,190 @@ async def cmd_volume(interaction: Interaction, volume: Range[float, 0, 2]):
 
     volume: float = float(volume)
     source.volume = clamp(volume, 0, 2)
+    checkpoint_session()
 
     await interaction.response.send_message(f"{Emoji.OK} Volume set to `{volume}`.", ephemeral=True)
 
 
-def main():
+@tree.command(
+    name="meter",
+    description="Show the audio levels of this server's stream: current peak and RMS, peak hold and clip count.",
+    guilds=valid_guilds
+)
+@describe(
+    reset="Reset the peak hold and clip count after showing them."
+)
+@check(is_whitelisted_user)
+async def cmd_meter(interaction: Interaction, reset: bool = False):
+    log.info(f"User {interaction.user} requested: meter (reset: {reset})")
+
+    guild_stream: Optional[GuildStream] = state.get(interaction.guild_id)
+    if guild_stream is None:
+        log.info("Can't show the meter: not connected.")
+        await interaction.response.send_message(f"{Emoji.WARNING} Can't show the meter: not connected.",
+                                                ephemeral=True)
+        return
+
+    if guild_stream.captured.is_opus():
+        log.info("Can't show the meter: Opus input is passed through without processing.")
+        await interaction.response.send_message(f"{Emoji.WARNING} Can't show the meter: the network input "
+                                                f"streams Opus as-is (use the pcm codec to meter it).",
+                                                ephemeral=True)
+        return
+
+    reading: MeterReading = guild_stream.captured.meter.reading()
+    if reset:
+        guild_stream.captured.meter.reset()
+
+    if reading.clip_count > 0:
+        summary = f"{Emoji.WARNING} Clipping in `{reading.clip_count}` frames - lower the volume."
+    elif reading.peak_hold_dbfs <= -90:
+        summary = f"{Emoji.EYES} Nothing but silence - is the input muted or disconnected?"
+    else:
+        summary = f"{Emoji.OK} Levels look fine."
+
+    await interaction.response.send_message(
+        f"{summary}\n```\n{format_reading(reading)}\n```",
+        ephemeral=True
+    )
+
+
+@tree.command(
+    name="denoise",
+    description="Enable, disable or relearn the noise suppression of the audio stream.",
+    guilds=valid_guilds
+)
+@describe(
+    action="\"on\"/\"off\" - toggle noise suppression; \"learn\" - relearn the background noise profile.",
+    reduction="Maximum noise attenuation in dB (0 to 40). Leave empty to keep the current value."
+)
+@check(is_whitelisted_user)
+async def cmd_denoise(
+        interaction: Interaction,
+        action: Literal["on", "off", "learn"],
+        reduction: Optional[Range[float, 0, 40]] = None,
+):
+    log.info(f"User {interaction.user} requested: denoise {action} (reduction: {reduction})")
+
+    guild_stream: Optional[GuildStream] = state.get(interaction.guild_id)
+    if guild_stream is None:
+        log.info("Can't change noise suppression: not connected.")
+        await interaction.response.send_message(f"{Emoji.WARNING} Can't change noise suppression: not connected.",
+                                                ephemeral=True)
+        return
+
+    source: AudioSource = guild_stream.pipeline
+    if source.is_opus():
+        log.info("Can't change noise suppression: Opus input is passed through without processing.")
+        await interaction.response.send_message(f"{Emoji.WARNING} Can't change noise suppression: the network input "
+                                                f"streams Opus as-is (use the pcm codec to enable it).",
+                                                ephemeral=True)
+        return
+    if not isinstance(source, PCMVolumeTransformer) \
+            or not isinstance(source.original, NoiseSuppressionTransformer):
+        log.error("Can't change noise suppression: source is not a NoiseSuppressionTransformer!")
+        await interaction.response.send_message(f"{Emoji.EYES} Can't change noise suppression: "
+                                                f"not a NoiseSuppressionTransformer (this is a bug)!",
+                                                ephemeral=True)
+        return
+    denoiser: NoiseSuppressionTransformer = source.original
+
+    if reduction is not None:
+        denoiser.suppressor.reduction_db = float(reduction)
+
+    if action == "learn":
+        denoiser.suppressor.relearn()
+        denoiser.enabled = True
+        message = f"{Emoji.OK} Learning the background noise profile for the next " \
+                  f"`{config.NOISE_SUPPRESSION_LEARNING_SECONDS}` seconds - keep quiet!"
+    else:
+        denoiser.enabled = action == "on"
+        message = f"{Emoji.OK} Noise suppression is now `{action}`"
+
+    checkpoint_session()
+    await interaction.response.send_message(
+        f"{message} (reduction: `{denoiser.suppressor.reduction_db} dB`).",
+        ephemeral=True
+    )
+
+
+@tree.command(
+    name="profile",
+    description="Profile this server's capture and player threads and receive a report of where the time goes.",
+    guilds=valid_guilds
+)
+@describe(
+    seconds="How long to profile for (1 to 60 seconds).",
+    mode="\"sampling\" - low-overhead statistical profiler (default); "
+         "\"deterministic\" - exact call counts and timings, but higher overhead."
+)
+@check(is_whitelisted_user)
+async def cmd_profile(
+        interaction: Interaction,
+        seconds: Range[int, 1, 60],
+        mode: Literal["sampling", "deterministic"] = "sampling",
+):
+    log.info(f"User {interaction.user} requested: profile for {seconds} seconds ({mode})")
+
+    guild_stream: Optional[GuildStream] = state.get(interaction.guild_id)
+    if guild_stream is None or guild_stream.captured.thread_ident is None:
+        log.info("Can't profile: not streaming.")
+        await interaction.response.send_message(f"{Emoji.WARNING} Can't profile: not streaming.", ephemeral=True)
+        return
+
+    if profiling_lock.locked():
+        log.info("Can't profile: already profiling.")
+        await interaction.response.send_message(f"{Emoji.WARNING} Can't profile: a profile is already running.",
+                                                ephemeral=True)
+        return
+
+    async with profiling_lock:
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        # The input is read and processed by the stream's capture thread, the processed frames are encoded
+        # and sent by discord's player thread.
+        captured: CapturedSource = guild_stream.captured
+        if mode == "sampling":
+            threads: dict[str, int] = {PROFILED_THREAD_CAPTURE: captured.thread_ident}
+            if captured.player_thread_ident is not None:
+                threads[PROFILED_THREAD_PLAYER] = captured.player_thread_ident
+            profiler = SamplingProfiler(threads)
+            await asyncio.to_thread(profiler.run, seconds)
+        else:
+            profiler = DeterministicProfiler(seconds, (PROFILED_THREAD_CAPTURE, PROFILED_THREAD_PLAYER))
+            captured.input_source.attach_profiler(profiler)
+            captured.attach_profiler(profiler)
+            await asyncio.to_thread(profiler.wait, seconds + 5)
+
+        report: str = profiler.report()
+
+    log.info(f"Profiling finished, sending report to {interaction.user}.")
+    await interaction.followup.send(
+        f"{Emoji.OK} Profiled the capture and player threads for `{seconds}` seconds ({mode}).",
+        file=File(io.BytesIO(report.encode("utf-8")), filename="profile.txt"),
+        ephemeral=True,
+    )
+
+
+def main(arguments: Optional[list[str]] = None):
+    """
+    :param arguments: Command line arguments (defaults to sys.argv).
+    """
+    parser = argparse.ArgumentParser(description="Audiophage - stream audio input to Discord voice channels.")
+    parser.add_argument(STARTUP_PROFILE_FLAG, action="store_true",
+                        help="Log how long importing each module and each startup step took once the bot is ready.")
+    parser.parse_args(arguments)
+
+    if config.EVENT_LOOP_USE_UVLOOP:
+        with startup_profiler.step("Installing uvloop"):
+            install_uvloop()
+
+    if config.SESSION_RESTORE_ENABLED:
+        with startup_profiler.step("Opening the inputs of the session to restore"):
+            preopen_session_inputs()
+
     log.info("Starting bot ...")
+    startup_profiler.mark("Logging in")
     client.run(config.BOT_TOKEN)
 
 if __name__ == '__main__':
@@ -0,0 +1,35 @@
+import argparse
+import logging
+import multiprocessing
+
+from core.configuration_base import DATA_DIR
+from core.supervisor import SupervisorConfiguration, Supervisor
+
+log = logging.getLogger("audiophage.supervisor")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run multiple Audiophage instances (each with its own configuration file) from a single host."
+    )
+    parser.add_argument(
+        "--configuration",
+        default=str(DATA_DIR / "supervisor.toml"),
+        help="Path to the supervisor configuration file (see data/supervisor.TEMPLATE.toml).",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[supervisor] %(levelname)s:%(name)s:%(message)s")
+
+    configuration = SupervisorConfiguration.from_file_path(args.configuration)
+    if len(configuration.INSTANCES) == 0:
+        log.error("The supervisor configuration does not contain any instances.")
+        return
+
+    Supervisor(configuration).run()
+
+
+if __name__ == '__main__':
+    # Required for worker processes in the packaged (PyInstaller) version.
+    multiprocessing.freeze_support()
+    main()